@@ -1,6 +1,7 @@
-from chessaholic import ChessEngine
+from chessaholic import ChessEngine, SearchLimits
 import chess
 import random
+from engine_utils import ATTACK_BONUS_SUMS, attack_defense_counts, material_score
 
 piece_values = {
     chess.PAWN: 1,
@@ -12,29 +13,16 @@ piece_values = {
 }
 
 class Aqua1(ChessEngine):
-    def __init__(self) -> None:
-        super().__init__("Aqua V1", "proplayer919")
+    def __init__(self, book: str = None) -> None:
+        super().__init__("Aqua V1", "proplayer919", book)
 
     def evaluate_board(self, board: chess.Board, color: chess.Color) -> float:
-        piece_score = 0
-        for square in chess.SQUARES:
-            piece = board.piece_at(square)
-            if piece is not None and piece.color == color:
-                piece_score += piece_values[piece.piece_type]
-
-        attack_score = 0
-        for square in chess.SQUARES:
-            piece = board.piece_at(square)
-            if piece is not None and piece.color != color:
-                for attacker in board.attackers(color, square):
-                    attack_score += 0.05
-
-        defense_score = 0
-        for square in chess.SQUARES:
-            piece = board.piece_at(square)
-            if piece is not None and piece.color == color:
-                for defender in board.attackers(color, square):
-                    defense_score += 0.05
+        piece_score = material_score(board, color, piece_values)
+
+        # 0.05 for every attack on an enemy piece and every defense of an own piece
+        attacks, defenses = attack_defense_counts(board, color)
+        attack_score = ATTACK_BONUS_SUMS[attacks]
+        defense_score = ATTACK_BONUS_SUMS[defenses]
 
         check_score = 2 if board.is_check() else 0
 
@@ -42,7 +30,11 @@ class Aqua1(ChessEngine):
 
         return float('inf') if board.is_checkmate() else combined_score
 
-    async def move(self, board: chess.Board, color: chess.Color) -> chess.Move:
+    async def move(
+        self, board: chess.Board, color: chess.Color, limits: SearchLimits = None
+    ) -> chess.Move:
+        # A one-ply search, always within any limits
+        self.start_search(limits)
         moves = list(board.generate_legal_moves())
 
         best_move = None
@@ -1,6 +1,7 @@
-from chessaholic import ChessEngine
+from chessaholic import ChessEngine, SearchLimits, SearchStopped
 import chess
 import random
+from engine_utils import ATTACK_BONUS_SUMS, attack_defense_counts, material_score
 
 piece_values = {
     chess.PAWN: 1,
@@ -13,29 +14,17 @@ piece_values = {
 
 
 class Aqua2(ChessEngine):
-    def __init__(self) -> None:
-        super().__init__("Aqua V2", "proplayer919")
+    def __init__(self, depth: int = 1, book: str = None) -> None:
+        super().__init__("Aqua V2", "proplayer919", book)
+        self.depth = depth
 
     def evaluate_board(self, board: chess.Board, color: chess.Color) -> float:
-        piece_score = 0
-        for square in chess.SQUARES:
-            piece = board.piece_at(square)
-            if piece is not None and piece.color == color:
-                piece_score += piece_values[piece.piece_type]
+        piece_score = material_score(board, color, piece_values)
 
-        attack_score = 0
-        for square in chess.SQUARES:
-            piece = board.piece_at(square)
-            if piece is not None and piece.color != color:
-                for attacker in board.attackers(color, square):
-                    attack_score += 0.05
-
-        defense_score = 0
-        for square in chess.SQUARES:
-            piece = board.piece_at(square)
-            if piece is not None and piece.color == color:
-                for defender in board.attackers(color, square):
-                    defense_score += 0.05
+        # 0.05 for every attack on an enemy piece and every defense of an own piece
+        attacks, defenses = attack_defense_counts(board, color)
+        attack_score = ATTACK_BONUS_SUMS[attacks]
+        defense_score = ATTACK_BONUS_SUMS[defenses]
 
         check_score = 2 if board.is_check() else 0
 
@@ -55,6 +44,8 @@ class Aqua2(ChessEngine):
         alpha: float = float("-inf"),
         beta: float = float("inf"),
     ) -> tuple[chess.Move, float]:
+        self.nodes += 1
+        self.check_limits()
         if depth == 0 or board.is_game_over():
             return None, self.evaluate_board(board, board.turn)
 
@@ -79,5 +70,16 @@ class Aqua2(ChessEngine):
 
         return best_move, best_evaluation
 
-    async def move(self, board: chess.Board, color: chess.Color) -> chess.Move:
-        return self.search(board, color, 1)[0]
+    async def move(
+        self, board: chess.Board, color: chess.Color, limits: SearchLimits = None
+    ) -> chess.Move:
+        self.start_search(limits)
+        best_move = None
+        for depth in self.search_depths(self.depth):
+            try:
+                move = self.search(board, color, depth)[0]
+            except SearchStopped:
+                break  # Keep the move of the last completed depth
+            if move is not None:
+                best_move = move
+        return best_move or next(iter(board.legal_moves), None)
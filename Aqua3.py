@@ -1,11 +1,18 @@
-from chessaholic import ChessEngine
+from chessaholic import ChessEngine, SearchLimits, SearchStopped
 import chess
+import chess.polyglot
 from engine_utils import *
 
 
 class Aqua3(ChessEngine):
-    def __init__(self) -> None:
-        super().__init__("Aqua V3", "proplayer919")
+    def __init__(
+        self, depth: int = 2, book: str = None, move_cache_size: int = MOVE_CACHE_SIZE
+    ) -> None:
+        super().__init__("Aqua V3", "proplayer919", book)
+        self.depth = depth
+        self.move_cache = MoveCache(move_cache_size)  # Legal moves by Zobrist hash
+        self.key_history = []  # Zobrist keys of the positions leading to the current node
+        self.root_ply = 0  # Length of key_history at the root
 
     def evaluate_board(self, board: chess.Board, color: chess.Color) -> float:
         piece_score = 0
@@ -45,13 +52,22 @@ class Aqua3(ChessEngine):
         in_check_sequence: bool = False,
     ) -> tuple[chess.Move, float]:
         """Improved search with depth extensions for checks and avoidance of repeated checks."""
+        self.nodes += 1
+        self.check_limits()
+
         # Check for terminal positions
-        if board.is_checkmate():
+        board_hash = chess.polyglot.zobrist_hash(board)
+        cached = self.move_cache.get(board, board_hash)
+        status = position_status(board, cached.moves)
+        if status.is_checkmate:
             return None, float("inf") if board.turn == color else float("-inf")
         if (
-            board.is_stalemate()
-            or board.is_insufficient_material()
-            or board.is_fivefold_repetition()
+            status.is_stalemate
+            or status.is_insufficient_material
+            or (
+                len(self.key_history) > self.root_ply
+                and is_repetition(self.key_history, board_hash, board.halfmove_clock)
+            )
         ):
             return None, 0  # Draw condition
 
@@ -60,8 +76,9 @@ class Aqua3(ChessEngine):
 
         best_move = None
         best_evaluation = float("-inf") if board.turn == color else float("inf")
-        moves = self.order_moves(board, list(board.legal_moves))
+        moves = self.order_moves(board, status.legal_moves, cached)
 
+        self.key_history.append(board_hash)
         for move in moves:
             if not board.is_legal(move):
                 continue
@@ -79,7 +96,11 @@ class Aqua3(ChessEngine):
                 in_check_sequence
                 and not new_board.is_checkmate()
                 and new_board.is_check()
-                and not new_board.is_repetition()
+                and not is_repetition(
+                    self.key_history,
+                    chess.polyglot.zobrist_hash(new_board),
+                    new_board.halfmove_clock,
+                )
             ):
                 next_depth -= 1  # Shorten search depth if stuck in check sequences
 
@@ -101,24 +122,41 @@ class Aqua3(ChessEngine):
             # Alpha-beta pruning
             if beta <= alpha:
                 break
+        self.key_history.pop()
 
         return best_move, best_evaluation
 
     def order_moves(
-        self, board: chess.Board, moves: list[chess.Move]
+        self,
+        board: chess.Board,
+        moves: list[chess.Move],
+        cached: CachedMoves = None,
     ) -> list[chess.Move]:
         # Prioritize captures, checks, and forcing moves
+        if cached is None:
+            cached = self.move_cache.get(board)
         return sorted(
             moves,
             key=lambda move: (
-                board.is_capture(move),
-                board.gives_check(move),
-                1 if move.promotion else 0,
+                move in cached.captures,
+                cached.gives_check(board, move),
+                move in cached.promotions,
             ),
             reverse=True,
         )
 
-    async def move(self, board: chess.Board, color: chess.Color) -> chess.Move:
-        return self.search(board, color, 2)[
-            0
-        ]  # Increase depth to 4 for better evaluation
+    async def move(
+        self, board: chess.Board, color: chess.Color, limits: SearchLimits = None
+    ) -> chess.Move:
+        self.start_search(limits)
+        self.key_history = position_keys(board)
+        self.root_ply = len(self.key_history)
+        best_move = None
+        for depth in self.search_depths(self.depth):
+            try:
+                move = self.search(board, color, depth)[0]
+            except SearchStopped:
+                break  # Keep the move of the last completed depth
+            if move is not None:
+                best_move = move
+        return best_move or next(iter(board.legal_moves), None)
@@ -1,16 +1,32 @@
-from chessaholic import ChessEngine
+from chessaholic import ChessEngine, SearchLimits, SearchStopped
 import chess
 from engine_utils import *
 import chess.polyglot
 import asyncio
+from mate_solver import MATE, find_mate
+
+MATE_SEARCH_NODES = 50_000  # Node table size for the mate pre-search
 
 
 class Aqua4(ChessEngine):
-    def __init__(self) -> None:
-        super().__init__("Aqua 4", "proplayer919")
+    def __init__(
+        self,
+        depth: int = 2,
+        hash_size: int = 1_000_000,
+        book: str = None,
+        mate_search: int = 0,
+        move_cache_size: int = MOVE_CACHE_SIZE,
+    ) -> None:
+        super().__init__("Aqua 4", "proplayer919", book)
+        self.depth = depth
+        self.mate_search = mate_search  # Longest mate the pre-search looks for, 0 for none
+        self.hash_size = hash_size  # Maximum transposition table entries
         self.transposition_table = {}
         self.history_table = {}  # For history heuristic
         self.killer_moves = {}  # For killer move heuristic
+        self.move_cache = MoveCache(move_cache_size)  # Legal moves by Zobrist hash
+        self.key_history = []  # Zobrist keys of the positions leading to the current node
+        self.root_ply = 0  # Length of key_history at the root
 
     def evaluate_board(self, board: chess.Board, color: chess.Color) -> float:
         piece_score = 0
@@ -52,8 +68,9 @@ class Aqua4(ChessEngine):
     def tactical_evaluation(self, board: chess.Board, color: chess.Color) -> float:
         """Evaluate common tactical patterns like forks, pins, and skewers."""
         tactical_score = 0
-        for move in board.legal_moves:
-            if board.gives_check(move):
+        cached = self.move_cache.get(board)
+        for move in cached.moves:
+            if cached.gives_check(board, move):
                 tactical_score += 5
 
         if board.is_attacked_by(color, board.king(not color)):
@@ -87,29 +104,37 @@ class Aqua4(ChessEngine):
         beta: float = float("inf"),
     ) -> tuple[chess.Move, float]:
         """Search function using async to avoid UI blocking."""
+        self.nodes += 1
+        self.check_limits()
         board_hash = chess.polyglot.zobrist_hash(board)
+
+        # Don't let the bot draw from repitition, even once inside the search
+        if len(self.key_history) > self.root_ply and is_repetition(
+            self.key_history, board_hash, board.halfmove_clock
+        ):
+            return None, -1000
+
         if (
             board_hash in self.transposition_table
             and self.transposition_table[board_hash][1] >= depth
         ):
             return self.transposition_table[board_hash]
 
-        if board.is_checkmate():
+        cached = self.move_cache.get(board, board_hash)
+        status = position_status(board, cached.moves)
+        if status.is_checkmate:
             return None, float("inf") if board.turn == color else float("-inf")
-        if board.is_stalemate() or board.is_insufficient_material():
+        if status.is_stalemate or status.is_insufficient_material:
             return None, 0
-        
-        # Don't let the bot draw from repitition
-        if board.can_claim_threefold_repetition():
-            return None, -1000
 
         if depth == 0:
             return None, await self.quiescence_search(board, color, alpha, beta)
 
         best_move = None
         best_evaluation = float("-inf") if board.turn == color else float("inf")
-        moves = self.order_moves(board, list(board.legal_moves))
+        moves = self.order_moves(board, status.legal_moves, cached)
 
+        self.key_history.append(board_hash)
         for move in moves:
             new_board = board.copy()
             new_board.push(move)
@@ -136,22 +161,26 @@ class Aqua4(ChessEngine):
                 self.update_history_heuristic(board, move, depth)
                 self.update_killer_moves(board, move)
                 break
+        self.key_history.pop()
 
-        self.transposition_table[board_hash] = (best_move, best_evaluation)
+        self.store_transposition(board_hash, (best_move, best_evaluation))
         return best_move, best_evaluation
 
     async def quiescence_search(
         self, board: chess.Board, color: chess.Color, alpha: float, beta: float
     ) -> float:
         """Quiescence search using async to prevent blocking."""
+        self.nodes += 1
+        self.check_limits()
         stand_pat = self.evaluate_board(board, color)
         if stand_pat >= beta:
             return beta
         if alpha < stand_pat:
             alpha = stand_pat
 
-        for move in board.legal_moves:
-            if not board.is_capture(move) and not board.gives_check(move):
+        cached = self.move_cache.get(board)
+        for move in cached.moves:
+            if move not in cached.captures and not cached.gives_check(board, move):
                 continue
             new_board = board.copy()
             new_board.push(move)
@@ -164,10 +193,21 @@ class Aqua4(ChessEngine):
 
         return alpha
 
+    def store_transposition(self, board_hash: int, entry: tuple) -> None:
+        """Store a transposition table entry, starting afresh once the table is full."""
+        if len(self.transposition_table) >= self.hash_size:
+            self.transposition_table.clear()
+        self.transposition_table[board_hash] = entry
+
     def order_moves(
-        self, board: chess.Board, moves: list[chess.Move]
+        self,
+        board: chess.Board,
+        moves: list[chess.Move],
+        cached: CachedMoves = None,
     ) -> list[chess.Move]:
         """Efficient move ordering with history and killer heuristics."""
+        if cached is None:
+            cached = self.move_cache.get(board)
         return sorted(
             moves,
             key=lambda move: (
@@ -175,9 +215,9 @@ class Aqua4(ChessEngine):
                 self.history_table.get(
                     (board.turn, move), 0
                 ),  # History heuristic priority
-                board.is_capture(move),
-                board.gives_check(move),
-                1 if move.promotion else 0,
+                move in cached.captures,
+                cached.gives_check(board, move),
+                move in cached.promotions,
             ),
             reverse=True,
         )
@@ -197,8 +237,50 @@ class Aqua4(ChessEngine):
             self.history_table.get((board.turn, move), 0) + depth**2
         )
 
-    async def move(self, board: chess.Board, color: chess.Color) -> chess.Move:
+    def find_forced_mate(self, board: chess.Board) -> list[chess.Move]:
+        """The mating line found by the proof-number pre-search, or None.
+
+        A mate limit overrides the engine's mate_search length for this move.
+        The node, movetime and stop limits bound the pre-search as well.
+        """
+        mate_moves = self.limits.mate or self.mate_search
+        if not mate_moves:
+            return None
+        node_limit = None
+        if self.limits.nodes is not None:
+            node_limit = max(self.limits.nodes - self.nodes, 0)
+        result = find_mate(
+            board,
+            mate_moves,
+            MATE_SEARCH_NODES,
+            node_limit,
+            self.search_deadline,
+            lambda: self.stop_requested,
+        )
+        self.nodes += result.nodes
+        return result.moves if result.status == MATE else None
+
+    async def move(
+        self, board: chess.Board, color: chess.Color, limits: SearchLimits = None
+    ) -> chess.Move:
         """Move calculation using asyncio without blocking."""
-        best_move, _ = await self.search(board, color, 2)
+        self.start_search(limits)
+        mate = self.find_forced_mate(board)
+        if mate is not None:
+            return mate[0]
+        self.key_history = position_keys(board)
+        self.root_ply = len(self.key_history)
+        best_move = None
+        for depth in self.search_depths(self.depth):
+            if self.limits.budgeted() and depth > 1:
+                # Entries keep no depth, so a shallower iteration's would cut this one short
+                self.transposition_table.clear()
+            try:
+                move, _ = await self.search(board, color, depth)
+            except SearchStopped:
+                break  # Keep the move of the last completed depth
+            if move is not None:
+                best_move = move
+        best_move = best_move or next(iter(board.legal_moves), None)
         print(f"Best move for {'white' if color == chess.WHITE else 'black'}: {best_move}")
         return best_move
@@ -0,0 +1,461 @@
+from Aqua4 import Aqua4
+from chessaholic import SearchLimits, SearchStopped
+import chess
+from engine_utils import *
+import chess.polyglot
+from typing import Callable
+
+NULL_WINDOW = 0.01  # Smaller than any difference the evaluation can produce
+
+# Transposition table bound flags
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+NULL_MOVE_REDUCTION = 2
+FUTILITY_MARGIN = 5.0  # Roughly a minor piece plus positional swing
+LMR_MIN_DEPTH = 3
+LMR_MIN_MOVE_INDEX = 3
+LMR_HISTORY_THRESHOLD = 50  # Quiet moves with more history than this are reduced less
+
+MAX_PLY = 64
+ASPIRATION_WINDOW = 1.0  # Half-width of the first window, in pawns
+
+
+class Aqua5(Aqua4):
+    def __init__(
+        self,
+        depth: int = 4,
+        hash_size: int = 1_000_000,
+        book: str = None,
+        mate_search: int = 0,
+        move_cache_size: int = MOVE_CACHE_SIZE,
+    ) -> None:
+        super().__init__(depth, hash_size, book, mate_search, move_cache_size)
+        self.name = "Aqua 5"
+        self.nodes = 0
+
+        # Triangular principal variation table: row ply holds the line from that ply
+        self.pv_table = [[None] * MAX_PLY for _ in range(MAX_PLY)]
+        self.pv_length = [0] * MAX_PLY
+        self.principal_variation = []
+        self.follow_pv = False
+        self.completed_depth = 0
+        self.excluded_root_moves = []  # Lines already found in a MultiPV iteration
+
+    def evaluate_board(self, board: chess.Board, color: chess.Color) -> float:
+        """Aqua4 evaluation with the position tables looked up once per call."""
+        piece_score = 0
+        positional_score = 0
+        position_table = get_position_table(board)
+
+        for square, piece in board.piece_map().items():
+            piece_value = piece_values[piece.piece_type]
+            if piece.color == color:
+                piece_score += piece_value
+                positional_score += position_table[piece.piece_type][square]
+            else:
+                piece_score -= piece_value
+
+        king_safety = self.evaluate_king_safety(board, color)
+        tactical_bonus = self.tactical_evaluation(board, color)
+
+        combined_score = piece_score + positional_score + king_safety + tactical_bonus
+        return combined_score if board.turn == color else -combined_score
+
+    def has_non_pawn_material(self, board: chess.Board, color: chess.Color) -> bool:
+        """Whether a side has anything besides pawns and its king (zugzwang guard)."""
+        return bool(board.occupied_co[color] & ~(board.pawns | board.kings))
+
+    def mvv_lva(self, board: chess.Board, move: chess.Move) -> int:
+        """Most valuable victim, least valuable attacker capture score."""
+        if board.is_en_passant(move):
+            return piece_values[chess.PAWN] * 10 - piece_values[chess.PAWN]
+        victim = board.piece_type_at(move.to_square)
+        attacker = board.piece_type_at(move.from_square)
+        if victim is None or attacker is None:
+            return 0
+        return piece_values[victim] * 10 - piece_values[attacker]
+
+    def order_moves(
+        self,
+        board: chess.Board,
+        moves: list[chess.Move],
+        tt_move: chess.Move = None,
+        cached: CachedMoves = None,
+    ) -> list[chess.Move]:
+        """Hash move first, then captures by MVV-LVA, promotions, killers and history."""
+        turn = board.turn
+        if cached is None:
+            cached = self.move_cache.get(board)
+        captures = cached.captures
+        promotions = cached.promotions
+
+        def key(move: chess.Move) -> tuple:
+            is_capture = move in captures
+            return (
+                move == tt_move,
+                is_capture,
+                self.mvv_lva(board, move) if is_capture else 0,
+                move in promotions,
+                self.killer_moves.get((turn, move), 0),
+                self.history_table.get((turn, move), 0),
+            )
+
+        return sorted(moves, key=key, reverse=True)
+
+    def quiescence(self, board: chess.Board, alpha: float, beta: float) -> float:
+        """Negamax quiescence search over captures and promotions."""
+        self.nodes += 1
+        self.check_limits()
+        stand_pat = self.evaluate_board(board, board.turn)
+        if stand_pat >= beta:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        cached = self.move_cache.get(board)
+        captures = [
+            move
+            for move in cached.moves
+            if move in cached.captures or move in cached.promotions
+        ]
+        for move in self.order_moves(board, captures, cached=cached):
+            board.push(move)
+            score = -self.quiescence(board, -beta, -alpha)
+            board.pop()
+
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+
+        return alpha
+
+    def negamax(
+        self,
+        board: chess.Board,
+        depth: int,
+        alpha: float,
+        beta: float,
+        ply: int,
+        allow_null: bool = True,
+    ) -> float:
+        """Principal variation search with null-move, futility and late move pruning."""
+        self.nodes += 1
+        self.check_limits()
+        self.pv_length[ply] = ply
+
+        board_hash = chess.polyglot.zobrist_hash(board)
+        cached = self.move_cache.get(board, board_hash)
+        status = position_status(board, cached.moves)
+        if status.is_checkmate:
+            return -MATE_SCORE + ply
+        if status.is_stalemate or status.is_insufficient_material:
+            return 0
+        if ply > 0 and is_repetition(
+            self.key_history, board_hash, board.halfmove_clock
+        ):
+            return 0
+
+        in_check = status.is_check
+        if in_check:
+            depth += 1  # Check extension
+
+        if depth <= 0 or ply >= MAX_PLY - 1:
+            return self.quiescence(board, alpha, beta)
+
+        pv_node = beta - alpha > NULL_WINDOW
+        original_alpha = alpha
+
+        # Transposition table probe
+        tt_move = None
+        entry = self.transposition_table.get(board_hash)
+        if entry is not None:
+            tt_depth, tt_flag, tt_score, tt_move = entry
+            if tt_depth >= depth and not pv_node and ply > 0:
+                tt_score = self.score_from_tt(tt_score, ply)
+                if tt_flag == EXACT:
+                    return tt_score
+                if tt_flag == LOWER_BOUND and tt_score >= beta:
+                    return tt_score
+                if tt_flag == UPPER_BOUND and tt_score <= alpha:
+                    return tt_score
+
+        static_eval = None
+        if not in_check and not pv_node:
+            static_eval = self.evaluate_board(board, board.turn)
+
+            # Null-move pruning, skipped when the side to move only has pawns
+            if (
+                allow_null
+                and depth > NULL_MOVE_REDUCTION
+                and static_eval >= beta
+                and abs(beta) < MATE_THRESHOLD
+                and self.has_non_pawn_material(board, board.turn)
+            ):
+                self.key_history.append(board_hash)
+                board.push(chess.Move.null())
+                score = -self.negamax(
+                    board,
+                    depth - 1 - NULL_MOVE_REDUCTION,
+                    -beta,
+                    -beta + NULL_WINDOW,
+                    ply + 1,
+                    allow_null=False,
+                )
+                board.pop()
+                self.key_history.pop()
+                if score >= beta:
+                    return beta
+
+        # Frontier node: quiet moves that cannot lift the score above alpha are skipped
+        futility_prune = (
+            depth == 1
+            and static_eval is not None
+            and static_eval + FUTILITY_MARGIN <= alpha
+            and abs(alpha) < MATE_THRESHOLD
+        )
+
+        legal_moves = status.legal_moves
+        if ply == 0 and self.excluded_root_moves:
+            legal_moves = [
+                move for move in legal_moves if move not in self.excluded_root_moves
+            ]
+
+        # Previous iteration's PV is tried first for as long as we are still on it
+        pv_move = None
+        if self.follow_pv:
+            if ply < len(self.principal_variation) and (
+                self.principal_variation[ply] in legal_moves
+            ):
+                pv_move = self.principal_variation[ply]
+            else:
+                self.follow_pv = False
+
+        best_move = None
+        best_score = -MATE_SCORE
+        moves = self.order_moves(board, legal_moves, pv_move or tt_move, cached)
+
+        for index, move in enumerate(moves):
+            quiet = move not in cached.captures and move not in cached.promotions
+            gives_check = cached.gives_check(board, move)
+
+            if futility_prune and index > 0 and quiet and not gives_check:
+                continue
+
+            self.key_history.append(board_hash)
+            board.push(move)
+            if index == 0:
+                score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+                self.follow_pv = False
+            else:
+                reduction = 0
+                if (
+                    depth >= LMR_MIN_DEPTH
+                    and index >= LMR_MIN_MOVE_INDEX
+                    and quiet
+                    and not in_check
+                    and not gives_check
+                ):
+                    reduction = 1 if index < 6 else 2
+                    history = self.history_table.get((not board.turn, move), 0)
+                    if history > LMR_HISTORY_THRESHOLD:
+                        reduction -= 1
+                    reduction = max(0, min(reduction, depth - 2))
+
+                # Zero-window search, re-searched at full depth and width if it fails high
+                score = -self.negamax(
+                    board, depth - 1 - reduction, -alpha - NULL_WINDOW, -alpha, ply + 1
+                )
+                if reduction and score > alpha:
+                    score = -self.negamax(
+                        board, depth - 1, -alpha - NULL_WINDOW, -alpha, ply + 1
+                    )
+                if alpha < score < beta:
+                    score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            board.pop()
+            self.key_history.pop()
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+                self.update_pv(ply, move)
+            if alpha >= beta:
+                if quiet:
+                    self.update_history_heuristic(board, move, depth)
+                    self.update_killer_moves(board, move)
+                break
+
+        if best_move is None:
+            # Every move was futility pruned; the static evaluation is the bound
+            return alpha
+
+        if best_score <= original_alpha:
+            flag = UPPER_BOUND
+        elif best_score >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.store_transposition(
+            board_hash, (depth, flag, self.score_to_tt(best_score, ply), best_move)
+        )
+        return best_score
+
+    def update_pv(self, ply: int, move: chess.Move) -> None:
+        """Prepend move to the child's line to form the PV from this ply."""
+        row = self.pv_table[ply]
+        child_row = self.pv_table[ply + 1]
+        row[ply] = move
+        child_length = self.pv_length[ply + 1]
+        row[ply + 1 : child_length] = child_row[ply + 1 : child_length]
+        self.pv_length[ply] = max(child_length, ply + 1)
+
+    def score_to_tt(self, score: float, ply: int) -> float:
+        """Store mate scores relative to the node rather than the root."""
+        if score >= MATE_THRESHOLD:
+            return score + ply
+        if score <= -MATE_THRESHOLD:
+            return score - ply
+        return score
+
+    def score_from_tt(self, score: float, ply: int) -> float:
+        """Convert a stored mate score back to the distance from the root."""
+        if score >= MATE_THRESHOLD:
+            return score - ply
+        if score <= -MATE_THRESHOLD:
+            return score + ply
+        return score
+
+    def search(
+        self,
+        board: chess.Board,
+        color: chess.Color,
+        depth: int,
+        alpha: float = -MATE_SCORE,
+        beta: float = MATE_SCORE,
+    ) -> tuple[list[chess.Move], float]:
+        """Search the root position and return the principal variation and its score for color."""
+        board = board.copy()
+        self.key_history = position_keys(board)
+        self.follow_pv = bool(self.principal_variation)
+        score = self.negamax(board, depth, alpha, beta, 0)
+        pv = self.pv_table[0][: self.pv_length[0]]
+        return pv, score if board.turn == color else -score
+
+    def iterative_deepening(
+        self,
+        board: chess.Board,
+        color: chess.Color,
+        depth: int,
+        should_stop: Callable[[], bool] = None,
+    ) -> tuple[list[chess.Move], float]:
+        """Deepen one ply at a time, searching each iteration in an aspiration window.
+
+        should_stop is checked between iterations to end the search early. The
+        search limits (see start_search) can also end an iteration part way,
+        leaving the result of the last completed one.
+        """
+        self.principal_variation = []
+        self.completed_depth = 0
+        pv, score = [], 0.0
+        for current_depth in range(1, depth + 1):
+            if should_stop is not None and current_depth > 1 and should_stop():
+                break
+            try:
+                if current_depth == 1 or abs(score) >= MATE_THRESHOLD:
+                    iteration_pv, iteration_score = self.search(
+                        board, color, current_depth
+                    )
+                else:
+                    iteration_pv, iteration_score = self.aspiration_search(
+                        board, color, current_depth, score
+                    )
+            except SearchStopped:
+                break
+            if iteration_pv:
+                pv, score = iteration_pv, iteration_score
+                self.principal_variation = pv
+            self.completed_depth = current_depth
+        return pv, score
+
+    def multipv(
+        self,
+        board: chess.Board,
+        color: chess.Color,
+        depth: int,
+        lines: int = 3,
+        should_stop: Callable[[], bool] = None,
+    ) -> list[tuple[list[chess.Move], float]]:
+        """The best lines root moves as (pv, score for color), best first.
+
+        Every iteration searches the root once per line, excluding the moves of
+        the lines already found. The transposition table, history and killers are
+        shared, so later lines and deeper iterations reuse the earlier work.
+        """
+        self.completed_depth = 0
+        results = []
+        for current_depth in range(1, depth + 1):
+            if should_stop is not None and current_depth > 1 and should_stop():
+                break
+            iteration = []
+            self.excluded_root_moves = []
+            try:
+                for index in range(lines):
+                    # Follow this line's PV from the previous iteration first
+                    self.principal_variation = (
+                        results[index][0] if index < len(results) else []
+                    )
+                    pv, score = self.search(board, color, current_depth)
+                    if not pv:
+                        break  # Fewer legal moves than lines
+                    iteration.append((pv, score))
+                    self.excluded_root_moves.append(pv[0])
+            except SearchStopped:
+                break  # Keep the lines of the last completed iteration
+            finally:
+                self.excluded_root_moves = []
+            if not iteration:
+                break
+            results = sorted(iteration, key=lambda line: line[1], reverse=True)
+            self.principal_variation = results[0][0]
+            self.completed_depth = current_depth
+        return results
+
+    def aspiration_search(
+        self, board: chess.Board, color: chess.Color, depth: int, previous_score: float
+    ) -> tuple[list[chess.Move], float]:
+        """Search around the previous score, widening only the side that failed."""
+        # Windows are in side-to-move terms, scores are returned for color
+        sign = 1 if board.turn == color else -1
+        center = previous_score * sign
+        low_width = high_width = ASPIRATION_WINDOW
+        while True:
+            alpha = max(center - low_width, -MATE_SCORE)
+            beta = min(center + high_width, MATE_SCORE)
+            pv, score = self.search(board, color, depth, alpha, beta)
+            relative_score = score * sign
+            if relative_score <= alpha and alpha > -MATE_SCORE:
+                low_width *= 4  # Fail low
+            elif relative_score >= beta and beta < MATE_SCORE:
+                high_width *= 4  # Fail high
+            else:
+                return pv, score
+
+    async def move(
+        self, board: chess.Board, color: chess.Color, limits: SearchLimits = None
+    ) -> chess.Move:
+        """Iteratively deepen up to the limits, after the mate pre-search."""
+        self.start_search(limits)
+        mate = self.find_forced_mate(board)
+        if mate is not None:
+            self.last_evaluation = MATE_SCORE - len(mate)
+            return mate[0]
+        pv, self.last_evaluation = self.iterative_deepening(
+            board, color, self.limits.search_depth(self.depth)
+        )
+        best_move = pv[0] if pv else next(iter(board.legal_moves), None)
+        print(
+            f"Best move for {'white' if color == chess.WHITE else 'black'}: {best_move}"
+        )
+        return best_move
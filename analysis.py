@@ -0,0 +1,241 @@
+"""Parallel batch analysis of EPD/FEN position files.
+
+Positions are read lazily and fanned out to a pool of engine processes with a
+bounded number in flight, so memory stays flat however large the file is.
+Results are yielded, and written, in completion order.
+
+Usage: python analysis.py positions.epd --engine aqua5:hash_size=500000 --depth 4 \
+           --workers 8 --output results.jsonl
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import contextlib
+import csv
+import json
+import os
+import sys
+import time
+from typing import Iterable, Iterator
+
+import chess
+
+from chessaholic import SearchLimits
+from engine_utils import mate_in
+from engines import create_engine, parse_engine_spec
+
+RESULT_FIELDS = [
+    "id",
+    "fen",
+    "best_move",
+    "score",
+    "mate",
+    "pv",
+    "depth",
+    "nodes",
+    "time",
+]
+
+# Engine owned by each worker process, created once by init_worker
+worker_engine = None
+
+
+def read_positions(path: str) -> Iterator[tuple[str, str]]:
+    """Lazily yield (id, fen) for each position in an EPD or FEN file."""
+    with open(path) as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                board = chess.Board(line)
+                position_id = str(line_number)
+            except ValueError:
+                board, operations = chess.Board.from_epd(line)
+                position_id = str(operations.get("id", line_number))
+            yield position_id, board.fen()
+
+
+def init_worker(engine_name: str, engine_options: dict) -> None:
+    global worker_engine
+    worker_engine = create_engine(engine_name, **engine_options)
+
+
+def score_fields(score: float) -> dict:
+    """A side-to-move score as result fields: pawns, or moves to mate with no score."""
+    mate = None if score is None else mate_in(score)
+    return {"score": None if mate is not None else score, "mate": mate}
+
+
+def analyse_position(
+    position_id: str,
+    fen: str,
+    depth: int,
+    nodes: int = None,
+    movetime: float = None,
+    multipv: int = 1,
+) -> dict:
+    """Search one position in this worker, stopping as soon as a limit is reached."""
+    engine = worker_engine
+    board = chess.Board(fen)
+    limits = SearchLimits(depth, nodes, movetime)
+    if hasattr(engine, "transposition_table"):
+        engine.transposition_table.clear()
+    started = time.perf_counter()
+
+    if not hasattr(engine, "iterative_deepening"):
+        # Fixed-depth engines only report their move
+        with contextlib.redirect_stdout(None):
+            move = asyncio.run(engine.move(board, board.turn, limits))
+        return {
+            "id": position_id,
+            "fen": fen,
+            "best_move": move.uci() if move else None,
+            **score_fields(engine.last_evaluation),
+            "pv": move.uci() if move else "",
+            "depth": depth if hasattr(engine, "depth") else None,
+            "nodes": engine.nodes,
+            "time": round(time.perf_counter() - started, 4),
+        }
+
+    engine.start_search(limits)
+    lines = None
+    if multipv > 1 and hasattr(engine, "multipv"):
+        lines = engine.multipv(board, board.turn, depth, multipv)
+        pv, score = lines[0] if lines else ([], 0.0)
+    else:
+        pv, score = engine.iterative_deepening(board, board.turn, depth)
+    result = {
+        "id": position_id,
+        "fen": fen,
+        "best_move": pv[0].uci() if pv else None,
+        **score_fields(score),
+        "pv": " ".join(move.uci() for move in pv),
+        "depth": engine.completed_depth,
+        "nodes": engine.nodes,
+        "time": round(time.perf_counter() - started, 4),
+    }
+    if lines is not None:
+        result["lines"] = [
+            {
+                "move": line[0].uci(),
+                **score_fields(line_score),
+                "pv": " ".join(move.uci() for move in line),
+            }
+            for line, line_score in lines
+        ]
+    return result
+
+
+def analyse_positions(
+    positions: Iterable[tuple[str, str]],
+    depth: int = 4,
+    nodes: int = None,
+    movetime: float = None,
+    workers: int = None,
+    engine: str = "aqua5",
+    engine_options: dict = None,
+    multipv: int = 1,
+) -> Iterator[dict]:
+    """Analyse (id, fen) pairs on a process pool, yielding results as they complete.
+
+    Each worker builds its own engine from the registry name and options. With
+    multipv above 1, results also hold the best lines as a list of move, score
+    and pv dicts.
+    """
+    workers = workers or os.cpu_count()
+    max_in_flight = workers * 2
+    positions = iter(positions)
+
+    with concurrent.futures.ProcessPoolExecutor(
+        workers, initializer=init_worker, initargs=(engine, engine_options or {})
+    ) as executor:
+        pending = set()
+        exhausted = False
+        while pending or not exhausted:
+            # Keep the pool busy without reading ahead of it
+            while not exhausted and len(pending) < max_in_flight:
+                position = next(positions, None)
+                if position is None:
+                    exhausted = True
+                    break
+                pending.add(
+                    executor.submit(
+                        analyse_position, *position, depth, nodes, movetime, multipv
+                    )
+                )
+            if not pending:
+                break
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                yield future.result()
+
+
+def write_results(
+    results: Iterable[dict], file, output_format: str, fields: list = RESULT_FIELDS
+) -> int:
+    """Stream results to file as JSON lines or CSV, flushing each row."""
+    count = 0
+    writer = None
+    if output_format == "csv":
+        writer = csv.DictWriter(file, fieldnames=fields)
+        writer.writeheader()
+    for result in results:
+        if writer is not None:
+            if "lines" in result:
+                result = dict(result, lines=json.dumps(result["lines"]))
+            writer.writerow(result)
+        else:
+            file.write(json.dumps(result) + "\n")
+        file.flush()
+        count += 1
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Analyse an EPD/FEN file in parallel.")
+    parser.add_argument("positions", help="EPD or FEN file, one position per line")
+    parser.add_argument(
+        "--engine", default="aqua5", help="Engine name with options, e.g. aqua5:depth=6"
+    )
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--nodes", type=int, default=None)
+    parser.add_argument(
+        "--movetime", type=float, default=None, help="Seconds per position"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--multipv", type=int, default=1, help="Best lines to report per position"
+    )
+    parser.add_argument("--output", default="-", help="Output file, - for stdout")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default=None)
+    options = parser.parse_args()
+
+    engine, engine_options = parse_engine_spec(options.engine)
+    output_format = options.format or (
+        "csv" if options.output.endswith(".csv") else "jsonl"
+    )
+    results = analyse_positions(
+        read_positions(options.positions),
+        options.depth,
+        options.nodes,
+        options.movetime,
+        options.workers,
+        engine,
+        engine_options,
+        options.multipv,
+    )
+    fields = RESULT_FIELDS + ["lines"] if options.multipv > 1 else RESULT_FIELDS
+    if options.output == "-":
+        count = write_results(results, sys.stdout, output_format, fields)
+    else:
+        with open(options.output, "w", newline="") as file:
+            count = write_results(results, file, output_format, fields)
+    print(f"Analysed {count} positions", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
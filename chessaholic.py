@@ -1,7 +1,17 @@
+import os
+
+# Keep pygame's import banner out of the output of the headless scripts
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
 import pygame
 import chess
-import time
+import chess.polyglot
 import asyncio
+import time
+from typing import NamedTuple
+from game_clock import GameClock, VirtualClock
+from engine_utils import position_status
+from engines import create_engine
 
 
 piece_values = {
@@ -25,6 +35,12 @@ DOT_COLOR_CAPTURE = (255, 0, 0)
 DOT_COLOR_SELECT = (0, 0, 255)
 SIDEBAR_BG = (50, 50, 50)
 TEXT_COLOR = (255, 255, 255)
+FPS = 30  # Frame rate cap while waiting on a human or an engine
+REVIEW_ENGINE = "aqua5"  # Evaluates positions in review mode
+REVIEW_DEPTH = 3
+REVIEW_MOVE_LINES = 4  # Move list lines shown around the current ply
+
+NODE_CHECK_INTERVAL = 1024  # Nodes searched between checks of the search limits
 
 # Time controls (5 minutes per player)
 TIME_CONTROL = "2+5"  # 30 minutes per player
@@ -54,6 +70,44 @@ PIECES = {
 for piece in PIECES:
     PIECES[piece] = pygame.transform.scale(PIECES[piece], (SQUARE_SIZE, SQUARE_SIZE))
 
+PIECES_CONVERTED = False
+
+
+def convert_piece_images():
+    """Convert the piece sprites to the display's pixel format (needs a display)."""
+    global PIECES_CONVERTED
+    if PIECES_CONVERTED:
+        return
+    for piece in PIECES:
+        PIECES[piece] = PIECES[piece].convert_alpha()
+    PIECES_CONVERTED = True
+
+
+def render_board_surface() -> pygame.Surface:
+    """Pre-render the empty chessboard once so frames can blit it instead of drawing 64 rects."""
+    surface = pygame.Surface((WIDTH, HEIGHT)).convert()
+    colors = [WHITE, BLACK]
+    for row in range(8):
+        for col in range(8):
+            pygame.draw.rect(
+                surface,
+                colors[(row + col) % 2],
+                pygame.Rect(
+                    col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE
+                ),
+            )
+    return surface
+
+
+def square_rect(square: chess.Square) -> pygame.Rect:
+    """Screen rectangle of a board square (white at the bottom)."""
+    return pygame.Rect(
+        chess.square_file(square) * SQUARE_SIZE,
+        (7 - chess.square_rank(square)) * SQUARE_SIZE,
+        SQUARE_SIZE,
+        SQUARE_SIZE,
+    )
+
 
 def parse_time(time_str):
     """Parse a time control string into minutes to start and seconds to add per move."""
@@ -61,54 +115,237 @@ def parse_time(time_str):
     return int(minutes), int(seconds)
 
 
-def draw_text_wrapped(surface, text, font, color, rect):
-    """Draw text with wrapping if it exceeds the width of the rect."""
+def wrap_text(text, font, width) -> list[str]:
+    """Split text into lines that fit within width pixels."""
     words = text.split(" ")
     lines = []
     current_line = ""
 
     for word in words:
         # Check if adding the next word will exceed the width
-        if font.size(current_line + word)[0] < rect.width:
+        if font.size(current_line + word)[0] < width:
             current_line += word + " "
         else:
             # Add the current line and start a new one
             lines.append(current_line)
             current_line = word + " "
     lines.append(current_line)  # Add the last line
+    return lines
+
+
+class TextCache:
+    """Rendered, pre-wrapped text surfaces keyed by sidebar slot.
+
+    Each key holds the surfaces for one string. Drawing a different string under
+    the same key (a clock ticking, the move number changing) evicts the old ones,
+    so the cache never grows beyond the number of slots.
+    """
+
+    def __init__(self) -> None:
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, text, font, color, width) -> list[pygame.Surface]:
+        """Return the line surfaces for text, rendering them only if the key's text changed."""
+        signature = (text, font, color, width)
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == signature:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        surfaces = [
+            font.render(line, True, color) for line in wrap_text(text, font, width)
+        ]
+        self.entries[key] = (signature, surfaces)
+        return surfaces
+
+    def evict(self, key) -> None:
+        """Drop the surfaces held under key."""
+        self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+
+def draw_text_wrapped(surface, text, font, color, rect, cache=None, key=None):
+    """Draw text with wrapping if it exceeds the width of the rect.
+
+    With a TextCache, the wrapped lines are rendered once and reused under key
+    (the text itself if no key is given) until that key's text changes.
+    """
+    if cache is not None:
+        lines = cache.get(key or text, text, font, color, rect.width)
+    else:
+        lines = (
+            font.render(line, True, color) for line in wrap_text(text, font, rect.width)
+        )
 
     y = rect.top
-    for line in lines:
+    for text_surface in lines:
         if y + font.get_height() > rect.bottom:
             break  # Stop drawing if we've reached the bottom of the rect
-        text_surface = font.render(line, True, color)
         surface.blit(text_surface, (rect.left, y))
         y += font.get_height()
 
 
+class SearchLimits(NamedTuple):
+    """Limits for one search. Unset limits are None."""
+
+    depth: int = None  # Plies; the engine's own depth if unset
+    nodes: int = None
+    movetime: float = None  # Seconds
+    mate: int = None  # Look for a mate in at most this many moves
+
+    def search_depth(self, default: int) -> int:
+        """The depth to search to: depth, else deep enough for the mate, else default."""
+        if self.depth is not None:
+            return self.depth
+        if self.mate is not None:
+            return 2 * self.mate - 1
+        return default
+
+    def budgeted(self) -> bool:
+        """Whether nodes or movetime may end the search before its depth."""
+        return self.nodes is not None or self.movetime is not None
+
+
+class SearchStopped(Exception):
+    """Raised inside a search once its limits are used up or a stop is requested."""
+
+
+async def request_engine_move(
+    engine,
+    board: chess.Board,
+    color: chess.Color,
+    profiler=None,
+    limits: SearchLimits = None,
+) -> chess.Move:
+    """Run an engine's move coroutine on a worker thread (see ChessEngine.blocking).
+
+    The event loop stays free to handle GUI events and to time the engine out,
+    even though engines search without ever yielding. With a profiler, only
+    that worker thread is sampled.
+    """
+    engine.stop_requested = False
+    engine.last_evaluation = None
+    engine.last_think_time = None
+    move = engine.book_move(board)
+    if move is not None:
+        return move
+    if not engine.blocking:
+        return await engine.move(board.copy(), color, limits)
+    if profiler is None:
+        return await asyncio.to_thread(
+            asyncio.run, engine.move(board.copy(), color, limits)
+        )
+
+    position = board.copy()
+
+    def think() -> chess.Move:
+        with profiler.profile(engine.name):
+            return asyncio.run(engine.move(position, color, limits))
+
+    return await asyncio.to_thread(think)
+
+
 class ChessEngine:
-    def __init__(self, name: str = "ChessEngine", author: str = "Anonymous") -> None:
+    # Engines that search without yielding run on a worker thread; engines whose
+    # move coroutine only awaits work done elsewhere run on the event loop
+    blocking = True
+
+    def __init__(
+        self, name: str = "ChessEngine", author: str = "Anonymous", book: str = None
+    ) -> None:
         self.name = name
         self.author = author
+        self.book = book  # Path to a polyglot opening book
+        self.stop_requested = False
+        # Score of the last move from the mover's side, for engines that report one
+        self.last_evaluation = None
+        # Nodes searched, for engines that count them
+        self.nodes = 0
+        # Seconds the last move took, for engines that report it themselves; a
+        # virtual clock charges this instead of the time it measured
+        self.last_think_time = None
+        self.limits = SearchLimits()  # Limits of the current search
+        self.search_deadline = None  # perf_counter time the movetime runs out
+
+    def stop(self) -> None:
+        """Ask a running search to finish as soon as possible."""
+        self.stop_requested = True
+
+    def start_search(self, limits: SearchLimits = None) -> None:
+        """Reset the node count and start the clock for a search within limits."""
+        self.limits = limits or SearchLimits()
+        self.nodes = 0
+        self.search_deadline = (
+            None
+            if self.limits.movetime is None
+            else time.perf_counter() + self.limits.movetime
+        )
+
+    def check_limits(self) -> None:
+        """Raise SearchStopped once the search must end.
+
+        Searches call this on every node after counting it, but only every
+        NODE_CHECK_INTERVAL nodes does it look at the limits and the clock.
+        """
+        if self.nodes % NODE_CHECK_INTERVAL:
+            return
+        if (
+            self.stop_requested
+            or (self.limits.nodes is not None and self.nodes >= self.limits.nodes)
+            or (
+                self.search_deadline is not None
+                and time.perf_counter() >= self.search_deadline
+            )
+        ):
+            raise SearchStopped
+
+    def search_depths(self, default: int) -> range:
+        """Depths to search in turn for the current limits.
+
+        Only the target depth, unless nodes or movetime may cut the search
+        short: then every depth up to it, so a best move is always ready.
+        """
+        depth = self.limits.search_depth(default)
+        return range(1 if self.limits.budgeted() else depth, depth + 1)
+
+    def book_move(self, board: chess.Board) -> chess.Move:
+        """A weighted random move from the opening book, or None if out of book."""
+        if self.book is None:
+            return None
+        with chess.polyglot.open_reader(self.book) as reader:
+            entry = reader.get(board)
+            return reader.weighted_choice(board).move if entry is not None else None
 
     async def move(
-        self,
-        board: chess.Board,
-        color: chess.Color,
-        time_remaining: int,
-        time_increment: int,
+        self, board: chess.Board, color: chess.Color, limits: SearchLimits = None
     ) -> chess.Move:
-        """Get a move from the engine."""
+        """Get a move from the engine, searching within limits."""
         pass
 
 
 class ChessGame:
     def __init__(
-        self, use_gui: bool = True, white: ChessEngine = None, black: ChessEngine = None
+        self,
+        use_gui: bool = True,
+        white: ChessEngine = None,
+        black: ChessEngine = None,
+        recorders: list = None,
+        profiler=None,
+        time_control: str = TIME_CONTROL,
+        virtual_clock: bool = False,
     ):
+        if use_gui and virtual_clock:
+            raise ValueError("A virtual clock only works without the GUI.")
         self.use_gui = use_gui
 
         self.board = chess.Board()
+        self.starting_fen = self.board.fen()
+        self.status = position_status(self.board)  # Legal moves and terminal flags
 
         if use_gui:
             self.screen = pygame.display.set_mode((SCREEN_WIDTH, HEIGHT))
@@ -116,80 +353,182 @@ class ChessGame:
                 f"Chessaholic Game: {white.name if white else 'Human'} vs. {black.name if black else 'Human'}"
             )
             self.selected_square = None
-            self.clock = pygame.time.Clock()
+
+            convert_piece_images()
+            self.board_surface = render_board_surface()
+            self.sidebar_rect = pygame.Rect(WIDTH, 0, SIDEBAR_WIDTH, HEIGHT)
+            self.text_cache = TextCache()
+
+            # What is currently on screen, so frames only redraw what changed
+            self.needs_full_redraw = True
+            self.drawn_pieces = {}
+            self.drawn_marks = set()
+            self.drawn_sidebar = None
+
+            # FEN after every ply, so review mode can jump to any ply without replaying
+            self.snapshots = [self.starting_fen]
+            self.review_ply = None  # Ply shown in review mode, None while playing
+            self.review_board = None
+            self.review_rows = []
+            self.review_row_of_ply = [0]
+            self.review_black_ply_parity = 0
+            self.review_evals = {}  # Ply -> white's score, filled in the background
+            self.review_engine = None
 
         self.legal_moves = []
         self.white = white
         self.black = black
         self.game_over = False
+        self.flagged = None  # Color that lost on time
 
         # Initialize clocks
-        self.white_time = parse_time(TIME_CONTROL)[0] * 60
-        self.black_time = self.white_time
-        self.time_bonus = parse_time(TIME_CONTROL)[1]
-        self.last_move_time = time.time()  # Store the last time a move was made
-        self.current_turn_time = None
+        minutes, increment = parse_time(time_control)
+        # A virtual clock charges engines their thinking time, not wall time
+        clock_class = VirtualClock if virtual_clock else GameClock
+        self.game_clock = clock_class(minutes * 60, increment)
+        self.time_control = f"{minutes * 60}+{increment}"
+
+        # Per-ply record of the mover's clock after the move and its engine eval
+        self.move_clocks = []
+        self.move_evals = []
+
+        # Game writers (see game_records) that receive each game as it finishes
+        self.recorders = recorders or []
+        self.profiler = profiler  # Optional profiling.MoveProfiler for engine moves
+
+    @property
+    def white_time(self) -> float:
+        """Seconds left on white's clock."""
+        return max(self.game_clock.remaining(chess.WHITE), 0)
+
+    @property
+    def black_time(self) -> float:
+        """Seconds left on black's clock."""
+        return max(self.game_clock.remaining(chess.BLACK), 0)
 
     def draw_board(self):
         """Draws the chessboard."""
-        colors = [WHITE, BLACK]
-        for row in range(8):
-            for col in range(8):
-                color = colors[(row + col) % 2]
-                pygame.draw.rect(
-                    self.screen,
-                    color,
-                    pygame.Rect(
-                        col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE
-                    ),
-                )
+        self.screen.blit(self.board_surface, (0, 0))
+
+    def shown_board(self) -> chess.Board:
+        """The position on screen: the reviewed ply, or the game in progress."""
+        return self.review_board if self.review_ply is not None else self.board
 
     def draw_pieces(self):
-        """Draws the chess pieces based on the board's FEN."""
-        fen = self.board.board_fen()
-        rows = fen.split(" ")[0].split("/")
-
-        for row_idx, row in enumerate(rows):
-            col_idx = 0
-            for char in row:
-                if char.isdigit():
-                    # Empty squares, skip by that many columns
-                    col_idx += int(char)
-                else:
-                    # Draw the piece
-                    self.screen.blit(
-                        PIECES[char],
-                        pygame.Rect(
-                            col_idx * SQUARE_SIZE,
-                            row_idx * SQUARE_SIZE,
-                            SQUARE_SIZE,
-                            SQUARE_SIZE,
-                        ),
-                    )
-                    col_idx += 1
+        """Draws every chess piece on the board."""
+        self.drawn_pieces = self.shown_board().piece_map()
+        for square, piece in self.drawn_pieces.items():
+            self.screen.blit(PIECES[piece.symbol()], square_rect(square))
+
+    def draw_square(self, square: chess.Square):
+        """Redraws a single square and the piece standing on it."""
+        rect = square_rect(square)
+        self.screen.blit(self.board_surface, rect, rect)
+        piece = self.shown_board().piece_at(square)
+        if piece is not None:
+            self.screen.blit(PIECES[piece.symbol()], rect)
+
+    def marked_squares(self) -> set[chess.Square]:
+        """Squares covered by the selection and available-move dots."""
+        if self.selected_square is None:
+            return set()
+        return {self.selected_square} | {move.to_square for move in self.legal_moves}
+
+    def render(self):
+        """Redraws only the squares and sidebar that changed since the last frame."""
+        marks = self.marked_squares()
+        sidebar_state = self.sidebar_state()
+
+        if self.needs_full_redraw:
+            self.draw_board()
+            self.draw_pieces()
+            if self.selected_square is not None:
+                self.draw_avalable_moves(self.selected_square)
+            self.draw_sidebar()
+            self.drawn_marks = marks
+            self.drawn_sidebar = sidebar_state
+            self.needs_full_redraw = False
+            pygame.display.flip()
+            return
+
+        pieces = self.shown_board().piece_map()
+        dirty_squares = {
+            square
+            for square in pieces.keys() | self.drawn_pieces.keys()
+            if pieces.get(square) != self.drawn_pieces.get(square)
+        }
+        if marks != self.drawn_marks:
+            dirty_squares |= marks | self.drawn_marks
+
+        dirty_rects = []
+        for square in dirty_squares:
+            self.draw_square(square)
+            dirty_rects.append(square_rect(square))
+        if self.selected_square is not None and dirty_squares & marks:
+            self.draw_avalable_moves(self.selected_square)
+        self.drawn_pieces = pieces
+        self.drawn_marks = marks
+
+        if sidebar_state != self.drawn_sidebar:
+            self.draw_sidebar()
+            self.drawn_sidebar = sidebar_state
+            dirty_rects.append(self.sidebar_rect)
+
+        if dirty_rects:
+            pygame.display.update(dirty_rects)
 
     def update_time(self):
-        """Update the time for the current player."""
-        now = time.time()
-        if self.board.turn == chess.WHITE:
-            self.white_time -= now - self.last_move_time
+        """Flag the side to move if its clock has run out."""
+        if not self.game_over and self.game_clock.is_flagged(self.board.turn):
+            self.flag(self.board.turn)
+
+    def flag(self, color: chess.Color):
+        """End the game as a loss on time for color."""
+        self.game_clock.stop()
+        self.flagged = color
+        winner = "Black" if color == chess.WHITE else "White"
+        self.game_over = f"{winner} wins on time!"
+
+    def update_game_status(self):
+        """Sets game_over to a description of the result, or an empty string while playing."""
+        self.status = position_status(self.board)
+        if self.status.is_checkmate:
+            winner = "Black" if self.board.turn == chess.WHITE else "White"
+            self.game_over = f"Winner: {winner}"
+        elif self.status.is_stalemate:
+            self.game_over = "Stalemate"
+        elif self.status.is_insufficient_material:
+            self.game_over = "Draw: Insufficient Material"
+        elif self.board.is_fivefold_repetition():
+            self.game_over = "Draw: 5-fold Repetition"
+        elif self.board.is_seventyfive_moves():
+            self.game_over = "Draw: 75-move Rule"
         else:
-            self.black_time -= now - self.last_move_time
-        self.last_move_time = now
-
-        # Check for time out
-        if self.white_time <= 0:
-            self.game_over = True
-            self.show_result("Black wins on time!")
-        elif self.black_time <= 0:
-            self.game_over = True
-            self.show_result("White wins on time!")
+            self.game_over = ""
+        if self.game_over:
+            self.game_clock.stop()  # Neither side's clock runs once the game is over
+
+    def sidebar_state(self) -> tuple:
+        """Everything the sidebar shows; it is only redrawn when this changes."""
+        if self.review_ply is not None:
+            return (
+                self.review_ply,
+                self.review_evals.get(self.review_ply),
+                self.game_over,
+                int(self.white_time),
+                int(self.black_time),
+            )
+        return (
+            self.board.turn,
+            self.board.fullmove_number,
+            self.game_over,
+            int(self.white_time),
+            int(self.black_time),
+        )
 
     def draw_sidebar(self):
         """Draws the sidebar with player information and game status."""
-        pygame.draw.rect(
-            self.screen, SIDEBAR_BG, pygame.Rect(WIDTH, 0, SIDEBAR_WIDTH, HEIGHT)
-        )
+        pygame.draw.rect(self.screen, SIDEBAR_BG, self.sidebar_rect)
 
         # White
         white_name = (
@@ -201,6 +540,8 @@ class ChessGame:
             font,
             TEXT_COLOR,
             pygame.Rect(WIDTH + 10, 10, SIDEBAR_WIDTH - 20, HEIGHT // 8),
+            self.text_cache,
+            "white_name",
         )
 
         # Black
@@ -213,7 +554,13 @@ class ChessGame:
             font,
             TEXT_COLOR,
             pygame.Rect(WIDTH + 10, 100, SIDEBAR_WIDTH - 20, HEIGHT // 8),
+            self.text_cache,
+            "black_name",
         )
+        if self.review_ply is not None:
+            self.draw_review_sidebar()
+            return
+
         # Turn Information
         turn_text = "White" if self.board.turn == chess.WHITE else "Black"
         draw_text_wrapped(
@@ -222,6 +569,8 @@ class ChessGame:
             font,
             TEXT_COLOR,
             pygame.Rect(WIDTH + 10, 190, SIDEBAR_WIDTH - 20, HEIGHT // 8),
+            self.text_cache,
+            "turn",
         )
 
         # Move amount
@@ -232,23 +581,11 @@ class ChessGame:
             font,
             TEXT_COLOR,
             pygame.Rect(WIDTH + 10, 230, SIDEBAR_WIDTH - 20, HEIGHT // 8),
+            self.text_cache,
+            "move",
         )
 
         # Game status
-        if self.board.is_checkmate():
-            winner = "Black" if self.board.turn == chess.WHITE else "White"
-            self.game_over = f"Winner: {winner}"
-        elif self.board.is_stalemate():
-            self.game_over = "Stalemate"
-        elif self.board.is_insufficient_material():
-            self.game_over = "Draw: Insufficient Material"
-        elif self.board.is_fivefold_repetition():
-            self.game_over = "Draw: 5-fold Repetition"
-        elif self.board.is_seventyfive_moves():
-            self.game_over = "Draw: 75-move Rule"
-        else:
-            self.game_over = ""
-
         if self.game_over:
             draw_text_wrapped(
                 self.screen,
@@ -256,9 +593,16 @@ class ChessGame:
                 font,
                 TEXT_COLOR,
                 pygame.Rect(WIDTH + 10, 320, SIDEBAR_WIDTH - 20, HEIGHT // 8),
+                self.text_cache,
+                "status",
             )
+        else:
+            self.text_cache.evict("status")
+
+        self.draw_clocks()
 
-        # Draw clocks
+    def draw_clocks(self):
+        """Draws both clocks at the bottom of the sidebar."""
         white_time_text = (
             f"White Time: {int(self.white_time // 60)}:{int(self.white_time % 60):02d}"
         )
@@ -271,6 +615,8 @@ class ChessGame:
             font,
             TEXT_COLOR,
             pygame.Rect(WIDTH + 10, 410, SIDEBAR_WIDTH - 20, HEIGHT // 8),
+            self.text_cache,
+            "white_time",
         )
         draw_text_wrapped(
             self.screen,
@@ -278,8 +624,118 @@ class ChessGame:
             font,
             TEXT_COLOR,
             pygame.Rect(WIDTH + 10, 460, SIDEBAR_WIDTH - 20, HEIGHT // 8),
+            self.text_cache,
+            "black_time",
         )
 
+    def draw_review_sidebar(self):
+        """Draws the reviewed ply, its evaluation and the moves around it."""
+        ply = self.review_ply
+        lines = [f"Ply {ply}/{len(self.snapshots) - 1}"]
+        score = self.review_evals.get(ply)
+        if score is None:
+            lines.append("Eval: ...")
+        elif abs(score) >= 1000:
+            lines.append(f"Eval: mate for {'White' if score > 0 else 'Black'}")
+        else:
+            lines.append(f"Eval: {score:+.2f}")
+
+        # Full moves around the reviewed one, with the last move played in brackets
+        rows = self.review_rows
+        current_row = self.review_row_of_ply[ply]
+        start = max(0, min(current_row - 1, len(rows) - REVIEW_MOVE_LINES))
+        for number, moves in rows[start : start + REVIEW_MOVE_LINES]:
+            text = f"{number}."
+            if moves[0][0] % 2 == self.review_black_ply_parity:
+                text += " ..."
+            for move_ply, san in moves:
+                text += f" [{san}]" if move_ply == ply else f" {san}"
+            lines.append(text)
+
+        for line_number, text in enumerate(lines):
+            draw_text_wrapped(
+                self.screen,
+                text,
+                font,
+                TEXT_COLOR,
+                pygame.Rect(WIDTH + 10, 190 + line_number * 30, SIDEBAR_WIDTH - 20, 30),
+                self.text_cache,
+                f"review_{line_number}",
+            )
+        self.draw_clocks()
+
+    def show_ply(self, ply: int):
+        """Shows the position after ply in review mode, without replaying the game."""
+        ply = max(0, min(ply, len(self.snapshots) - 1))
+        if ply == self.review_ply:
+            return
+        self.review_ply = ply
+        self.review_board = chess.Board(self.snapshots[ply])
+
+    async def evaluate_ply(self, ply: int) -> float:
+        """White's score for the position after ply, searched on a worker thread."""
+        board = chess.Board(self.snapshots[ply])
+        status = position_status(board)
+        if status.is_checkmate:
+            return float("-inf") if board.turn == chess.WHITE else float("inf")
+        if status.is_stalemate or status.is_insufficient_material:
+            return 0.0
+        if self.review_engine is None:
+            self.review_engine = create_engine(REVIEW_ENGINE, depth=REVIEW_DEPTH)
+        engine = self.review_engine
+        await asyncio.to_thread(asyncio.run, engine.move(board, board.turn))
+        score = engine.last_evaluation or 0.0
+        return score if board.turn == chess.WHITE else -score
+
+    async def review(self):
+        """Step through the finished game until the window is closed.
+
+        Left and right move one ply, up and down jump to the start and end.
+        Evaluations are searched one at a time for the ply on screen and cached.
+        """
+        # Move list rows of (move number, [(ply, san), ...]) and the row of every ply
+        replay = chess.Board(self.starting_fen)
+        self.review_black_ply_parity = 0 if replay.turn == chess.WHITE else 1
+        self.review_rows = []
+        self.review_row_of_ply = [0]
+        for ply, move in enumerate(self.board.move_stack, 1):
+            if replay.turn == chess.WHITE or not self.review_rows:
+                self.review_rows.append((replay.fullmove_number, []))
+            self.review_rows[-1][1].append((ply, replay.san(move)))
+            self.review_row_of_ply.append(len(self.review_rows) - 1)
+            replay.push(move)
+        self.selected_square = None
+        self.legal_moves = []
+        self.show_ply(len(self.snapshots) - 1)
+
+        eval_task, eval_ply = None, None
+        keys = {
+            pygame.K_LEFT: lambda: self.review_ply - 1,
+            pygame.K_RIGHT: lambda: self.review_ply + 1,
+            pygame.K_UP: lambda: 0,
+            pygame.K_HOME: lambda: 0,
+            pygame.K_DOWN: lambda: len(self.snapshots) - 1,
+            pygame.K_END: lambda: len(self.snapshots) - 1,
+        }
+        while True:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    if eval_task is not None:
+                        self.review_engine.stop()
+                    return
+                if event.type == pygame.KEYDOWN and event.key in keys:
+                    self.show_ply(keys[event.key]())
+
+            if eval_task is not None and eval_task.done():
+                self.review_evals[eval_ply] = eval_task.result()
+                eval_task = None
+            if eval_task is None and self.review_ply not in self.review_evals:
+                eval_ply = self.review_ply
+                eval_task = asyncio.create_task(self.evaluate_ply(eval_ply))
+
+            self.render()
+            await asyncio.sleep(1 / FPS)
+
     def draw_avalable_moves(self, square: chess.Square):
         """Draws the available moves on the board for the selected piece."""
         pygame.draw.circle(
@@ -304,6 +760,79 @@ class ChessGame:
                     10,
                 )
 
+    def current_player(self) -> ChessEngine:
+        """The engine to move, or None if it is a human's turn."""
+        return self.white if self.board.turn == chess.WHITE else self.black
+
+    def result(self) -> str:
+        """The game result in PGN notation, counting losses on time."""
+        if self.flagged is not None:
+            return "0-1" if self.flagged == chess.WHITE else "1-0"
+        return self.board.result()
+
+    def push_move(self, move: chess.Move, evaluation: float = None):
+        """Plays a move for the side to move and updates the clocks and game status."""
+        mover = self.board.turn
+        self.game_clock.press()  # Charge the mover once and add its increment
+        self.board.push(move)
+        self.move_clocks.append(max(self.game_clock.remaining(mover), 0))
+        self.move_evals.append(evaluation)
+        if self.use_gui:
+            self.selected_square = None
+            self.legal_moves = []
+            self.snapshots.append(self.board.fen())
+        self.update_game_status()
+
+    async def engine_move(self, engine: ChessEngine) -> chess.Move:
+        """Ask engine for a move, flagging it as soon as its clock runs out."""
+        color = self.board.turn
+        if isinstance(self.game_clock, VirtualClock):
+            return await self.virtual_engine_move(engine)
+        try:
+            return await asyncio.wait_for(
+                request_engine_move(engine, self.board, color, self.profiler),
+                timeout=max(self.game_clock.remaining(color), 0),
+            )
+        except asyncio.TimeoutError:
+            engine.stop()
+            self.flag(color)
+            return None
+
+    async def virtual_engine_move(self, engine: ChessEngine) -> chess.Move:
+        """Ask engine for a move and advance the virtual clock by its thinking time.
+
+        The engine is charged the time it reports in last_think_time, or else
+        the time it took, and flagged afterwards if that overran its clock. Its
+        remaining time is also its movetime, so a runaway search still stops.
+        """
+        color = self.board.turn
+        limits = SearchLimits(movetime=max(self.game_clock.remaining(color), 0))
+        started = time.perf_counter()
+        move = await request_engine_move(
+            engine, self.board, color, self.profiler, limits
+        )
+        think_time = engine.last_think_time
+        if think_time is None:
+            think_time = time.perf_counter() - started
+        self.game_clock.advance(think_time)
+        if self.game_clock.is_flagged(color):
+            self.flag(color)
+            return None
+        return move
+
+    def handle_events(self) -> bool:
+        """Handles pending pygame events. Returns False once the window is closed."""
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+            if (
+                event.type == pygame.MOUSEBUTTONDOWN
+                and event.button == 1
+                and self.current_player() is None
+            ):
+                self.handle_click(event.pos)
+        return True
+
     def handle_click(self, pos: tuple[int, int]):
         """Handles mouse click events."""
         if pos[0] > WIDTH:  # Ignore clicks on the sidebar
@@ -313,40 +842,34 @@ class ChessGame:
             return
 
         self.update_time()  # Update time before handling move
+        if self.game_over:
+            return  # The human just lost on time
 
         col, row = pos[0] // SQUARE_SIZE, pos[1] // SQUARE_SIZE
         square = chess.square(col, 7 - row)
 
         if self.selected_square is None:
-            # Select a piece
-            if self.board.piece_at(square) is not None:
+            # Select a piece of the side to move
+            if self.board.color_at(square) == self.board.turn:
                 self.selected_square = square
                 self.legal_moves = [
                     move
-                    for move in self.board.legal_moves
+                    for move in self.status.legal_moves
                     if move.from_square == square
                 ]
         else:
-            if self.board.turn == chess.WHITE:
-                self.white_time += self.time_bonus
-            else:
-                self.black_time += self.time_bonus
-
             # Try to move the piece to the clicked square
             move = chess.Move(self.selected_square, square)
 
             # Check if the move is a pawn promotion
-            if chess.PAWN == self.board.piece_type_at(self.selected_square) and (
-                chess.square_rank(square) == 7 or chess.square_rank(square) == 0
-            ):
+            queen_promotion = chess.Move(self.selected_square, square, chess.QUEEN)
+            if queen_promotion in self.legal_moves:
                 # Promotion handling
                 promotion_piece = self.get_promotion_choice()
                 move.promotion = promotion_piece
 
-            if move in self.board.legal_moves:
-                self.board.push(move)
-                self.selected_square = None
-                self.legal_moves = []
+            if move in self.status.legal_moves:
+                self.push_move(move)
             else:
                 # Reset selection if illegal move
                 self.selected_square = None
@@ -358,73 +881,80 @@ class ChessGame:
         promotion_names = ["Queen", "Rook", "Bishop", "Knight"]
 
         # Display promotion options
-        promotion_popup = True
-        while promotion_popup:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    quit()
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    x, y = pygame.mouse.get_pos()
-                    if WIDTH // 2 - 50 < x < WIDTH // 2 + 50:
-                        for i, piece in enumerate(promotion_pieces):
-                            if HEIGHT // 2 + i * 60 < y < HEIGHT // 2 + (i + 1) * 60:
-                                promotion_popup = False
-                                return piece
-
-            self.screen.fill(WHITE)
-            for i, name in enumerate(promotion_names):
-                text = font.render(name, True, BLACK)
-                self.screen.blit(
-                    text, (WIDTH // 2 - text.get_width() // 2, HEIGHT // 2 + i * 60)
-                )
-
-            pygame.display.flip()
+        self.screen.fill(WHITE)
+        for i, name in enumerate(promotion_names):
+            text = font.render(name, True, BLACK)
+            self.screen.blit(
+                text, (WIDTH // 2 - text.get_width() // 2, HEIGHT // 2 + i * 60)
+            )
+        pygame.display.flip()
+        self.needs_full_redraw = True
+
+        # Sleep until the player clicks a choice
+        while True:
+            event = pygame.event.wait()
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                quit()
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                x, y = event.pos
+                if WIDTH // 2 - 50 < x < WIDTH // 2 + 50:
+                    for i, piece in enumerate(promotion_pieces):
+                        if HEIGHT // 2 + i * 60 < y < HEIGHT // 2 + (i + 1) * 60:
+                            return piece
 
     async def play_game(self):
-        if self.white is None or self.black is None:
+        if not self.use_gui and (self.white is None or self.black is None):
             raise ValueError(
-                "Both white and black engines must be provided to play the game."
+                "Both white and black engines must be provided to play without the GUI."
             )
 
-        running = True
-        while running and not self.game_over:
-            # Handle engine move if necessary
-            current_player = (
-                self.white if self.board.turn == chess.WHITE else self.black
-            )
-            self.update_time()
-            
-            move = await current_player.move(self.board, self.board.turn)
-            if move and move in self.board.legal_moves:
-                self.board.push(move)
-                self.last_move_time = time.time()  # Reset last move time
-                if self.board.turn == chess.WHITE:
-                    self.white_time += self.time_bonus  # Increment time after each move
-                else:
-                    self.black_time += self.time_bonus
-
-            # Update and draw game state
+        engine_task = None
+        self.game_clock.start(self.board.turn)
+        while not self.game_over:
+            current_player = self.current_player()
+
+            if not self.use_gui:
+                move = await self.engine_move(current_player)
+                if move and move in self.status.legal_moves:
+                    self.push_move(move, current_player.last_evaluation)
+                self.update_time()
+                continue
+
+            if not self.handle_events():
+                if engine_task is not None:
+                    engine_task.cancel()
+                pygame.quit()
+                return
+
+            # Engines think on a worker thread while this loop keeps drawing
+            if current_player is not None:
+                if engine_task is None:
+                    engine_task = asyncio.create_task(self.engine_move(current_player))
+                elif engine_task.done():
+                    move = engine_task.result()
+                    engine_task = None
+                    if move and move in self.status.legal_moves:
+                        self.push_move(move, current_player.last_evaluation)
+
             self.update_time()
-            if self.use_gui:
-                self.draw_board()
-                self.draw_pieces()
-                self.draw_sidebar()
-                pygame.display.flip()
+            self.render()
+            await asyncio.sleep(1 / FPS)  # Throttled tick, yields to the engine task
 
-                self.clock.tick(60)  # Maintain FPS to avoid excessive CPU usage
+        if engine_task is not None and not engine_task.done():
+            engine_task.cancel()  # The engine ran out of time mid-search
+            self.current_player().stop()
 
         if self.game_over:
             self.show_result(
-                f"{self.game_over} in {self.board.fullmove_number} moves: {self.board.result()}"
+                f"{self.game_over} in {self.board.fullmove_number} moves: {self.result()}"
             )
+        for recorder in self.recorders:
+            recorder.write_game(self)
 
         if self.use_gui:
-            while True:
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT:
-                        pygame.quit()
-                        quit()
+            await self.review()
+            pygame.quit()
 
     def show_result(self, result_text: str):
         """Display the result and end the game."""
@@ -1,4 +1,7 @@
+import collections
 import chess
+import chess.polyglot
+from typing import NamedTuple
 
 def is_middle_game(board: chess.Board) -> bool:
     # Count the major and minor pieces remaining
@@ -491,3 +494,169 @@ def get_position_table(board: chess.Board) -> dict[list[float]]:
         chess.KING: king_table_midgame if is_middle_game(board) else king_table_endgame,
     }
     return position_tables
+
+
+def position_keys(board: chess.Board) -> list[int]:
+    """Zobrist keys of the positions since the last irreversible move, oldest first."""
+    board = board.copy()
+    keys = []
+    for _ in range(min(board.halfmove_clock, len(board.move_stack))):
+        board.pop()
+        keys.append(chess.polyglot.zobrist_hash(board))
+    keys.reverse()
+    return keys
+
+
+def is_repetition(key_history: list[int], key: int, halfmove_clock: int) -> bool:
+    """Whether the position with this key already occurred since the last irreversible move.
+
+    key_history holds the keys of the positions leading to this one, oldest
+    first. Only every other key can match, as the side to move must be the same.
+    """
+    stop = max(len(key_history) - halfmove_clock, 0)
+    for index in range(len(key_history) - 2, stop - 1, -2):
+        if key_history[index] == key:
+            return True
+    return False
+
+
+MATE_SCORE = 100000.0  # Score of mating at once; a mate n plies away scores n less
+MATE_THRESHOLD = MATE_SCORE - 1000  # Scores beyond this are forced mates
+
+
+def mate_in(score: float) -> int:
+    """Moves to mate for a score beyond MATE_THRESHOLD, negative if being mated, else None.
+
+    Infinite scores, from engines that do not count plies, count as mate in one.
+    """
+    if abs(score) < MATE_THRESHOLD:
+        return None
+    plies = max(MATE_SCORE - abs(score), 1)
+    moves = (int(plies) + 1) // 2
+    return moves if score > 0 else -moves
+
+
+class PositionStatus(NamedTuple):
+    """A position's legal moves with the check, mate and draw flags derived from them."""
+
+    legal_moves: list[chess.Move]
+    is_check: bool
+    is_checkmate: bool
+    is_stalemate: bool
+    is_insufficient_material: bool
+
+
+def position_status(
+    board: chess.Board, legal_moves: list[chess.Move] = None
+) -> PositionStatus:
+    """Generate the legal moves once, unless given, and classify the position from them."""
+    if legal_moves is None:
+        legal_moves = list(board.legal_moves)
+    is_check = board.is_check()
+    return PositionStatus(
+        legal_moves,
+        is_check,
+        not legal_moves and is_check,
+        not legal_moves and not is_check,
+        bool(legal_moves) and board.is_insufficient_material(),
+    )
+
+
+MOVE_CACHE_SIZE = 10_000  # Positions kept by a MoveCache, about 4 KB each
+
+
+class CachedMoves:
+    """A position's legal moves with their capture, promotion and check flags.
+
+    Checks cost far more to find than the rest, so each move's check flag is
+    only worked out the first time gives_check asks for it.
+    """
+
+    __slots__ = ("moves", "captures", "promotions", "checks")
+
+    def __init__(self, board: chess.Board) -> None:
+        self.moves = list(board.legal_moves)
+        # board.is_capture, with the enemy pieces and en passant square looked up once
+        enemy = board.occupied_co[not board.turn]
+        ep_square = board.ep_square
+        self.captures = frozenset(
+            move
+            for move in self.moves
+            if chess.BB_SQUARES[move.to_square] & enemy
+            or (move.to_square == ep_square and board.is_en_passant(move))
+        )
+        self.promotions = frozenset(move for move in self.moves if move.promotion)
+        self.checks = {}  # Move -> whether it gives check, filled on demand
+
+    def gives_check(self, board: chess.Board, move: chess.Move) -> bool:
+        """board.gives_check(move), remembered; board must be this position."""
+        check = self.checks.get(move)
+        if check is None:
+            check = self.checks[move] = board.gives_check(move)
+        return check
+
+
+class MoveCache:
+    """Bounded cache of CachedMoves keyed by Zobrist hash, evicting the least recently used.
+
+    hits and misses count lookups since the last clear, to size the cache by.
+    """
+
+    def __init__(self, size: int = MOVE_CACHE_SIZE) -> None:
+        self.size = size
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, board: chess.Board, key: int = None) -> CachedMoves:
+        """The moves of board, whose Zobrist hash is key, generated only on a miss."""
+        if key is None:
+            key = chess.polyglot.zobrist_hash(board)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry
+        self.misses += 1
+        entry = self.entries[key] = CachedMoves(board)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+        return entry
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# 0.05 added n times, in order, as the Aqua1 and Aqua2 evaluations accumulated
+# their attack and defense bonuses, so totals built from counts match to the bit
+ATTACK_BONUS_SUMS = [0.0]
+for _ in range(64 * 16):
+    ATTACK_BONUS_SUMS.append(ATTACK_BONUS_SUMS[-1] + 0.05)
+
+
+def attack_defense_counts(board: chess.Board, color: chess.Color) -> tuple[int, int]:
+    """Attacks by color's pieces on enemy pieces and on its own pieces, one per attacker."""
+    own = board.occupied_co[color]
+    enemy = board.occupied_co[not color]
+    attacks = defenses = 0
+    for square in chess.scan_reversed(own):
+        mask = board.attacks_mask(square)
+        attacks += (mask & enemy).bit_count()
+        defenses += (mask & own).bit_count()
+    return attacks, defenses
+
+
+def material_score(
+    board: chess.Board, color: chess.Color, values: dict = piece_values
+) -> int:
+    """Sum of the piece values over color's pieces."""
+    return sum(
+        values[piece_type] * board.pieces_mask(piece_type, color).bit_count()
+        for piece_type in chess.PIECE_TYPES
+    )
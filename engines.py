@@ -0,0 +1,107 @@
+import importlib
+
+
+class EngineOption:
+    """A constructor option an engine accepts, with its type, default and help text."""
+
+    def __init__(self, name: str, value_type: type, default, help: str = "") -> None:
+        self.name = name
+        self.value_type = value_type
+        self.default = default
+        self.help = help
+
+    def parse(self, value):
+        """Convert a value, possibly a command-line string, to the option's type."""
+        if value is None or isinstance(value, self.value_type):
+            return value
+        return self.value_type(value)
+
+
+def depth_option(default: int) -> EngineOption:
+    return EngineOption("depth", int, default, "Search depth in plies")
+
+
+HASH_SIZE = EngineOption(
+    "hash_size", int, 1_000_000, "Maximum transposition table entries"
+)
+MOVE_CACHE_SIZE = EngineOption(
+    "move_cache_size", int, 10_000, "Positions whose legal moves are cached"
+)
+BOOK = EngineOption("book", str, None, "Path to a polyglot opening book")
+MATE_SEARCH = EngineOption(
+    "mate_search", int, 0, "Longest forced mate, in moves, to look for before searching"
+)
+
+
+class EngineSpec:
+    """Where to import an engine class from, and the options its constructor takes."""
+
+    def __init__(self, module: str, class_name: str, options: list = ()) -> None:
+        self.module = module
+        self.class_name = class_name
+        self.options = {option.name: option for option in options}
+
+    def load(self) -> type:
+        """Import the engine's module on first use and return the class."""
+        return getattr(importlib.import_module(self.module), self.class_name)
+
+
+ENGINES = {
+    "aqua1": EngineSpec("Aqua1", "Aqua1", [BOOK]),
+    "aqua2": EngineSpec("Aqua2", "Aqua2", [depth_option(1), BOOK]),
+    "aqua3": EngineSpec("Aqua3", "Aqua3", [depth_option(2), BOOK, MOVE_CACHE_SIZE]),
+    "aqua4": EngineSpec(
+        "Aqua4",
+        "Aqua4",
+        [depth_option(2), HASH_SIZE, BOOK, MATE_SEARCH, MOVE_CACHE_SIZE],
+    ),
+    "aqua5": EngineSpec(
+        "Aqua5",
+        "Aqua5",
+        [depth_option(4), HASH_SIZE, BOOK, MATE_SEARCH, MOVE_CACHE_SIZE],
+    ),
+    "random": EngineSpec("randombot", "RandomBot"),
+}
+
+
+def get_spec(name: str) -> EngineSpec:
+    try:
+        return ENGINES[name.lower()]
+    except KeyError:
+        raise ValueError(
+            f"Unknown engine {name!r}; available: {', '.join(ENGINES)}"
+        ) from None
+
+
+def engine_class(name: str) -> type:
+    """The engine class registered under name, imported only now."""
+    return get_spec(name).load()
+
+
+def engine_options(name: str, **options) -> dict:
+    """Validate and convert options against the engine's schema."""
+    spec = get_spec(name)
+    parsed = {}
+    for key, value in options.items():
+        if key not in spec.options:
+            raise ValueError(
+                f"Engine {name!r} has no option {key!r}; "
+                f"options: {', '.join(spec.options) or 'none'}"
+            )
+        parsed[key] = spec.options[key].parse(value)
+    return parsed
+
+
+def create_engine(name: str, **options):
+    """Build the engine registered under name with the given constructor options."""
+    return engine_class(name)(**engine_options(name, **options))
+
+
+def parse_engine_spec(text: str) -> tuple[str, dict]:
+    """Parse "name" or "name:key=value,key=value" into a name and options."""
+    name, _, option_text = text.partition(":")
+    options = {}
+    for pair in filter(None, option_text.split(",")):
+        key, _, value = pair.partition("=")
+        options[key.strip().replace("-", "_")] = value.strip()
+    return name, engine_options(name, **options)
@@ -0,0 +1,171 @@
+"""Run an engine over a bm/am EPD test suite and report solve times.
+
+Usage: python epd_suite.py suite.epd --engine aqua4:depth=3 --time 5 --output results.csv
+"""
+
+import argparse
+import asyncio
+import csv
+import statistics
+import time
+
+import chess
+
+from chessaholic import SearchLimits, request_engine_move
+from engines import create_engine, parse_engine_spec
+
+SOLVE_TIME_BUCKETS = [0.1, 0.5, 1, 2, 5, 10, 30, 60]
+
+
+def read_suite(path: str) -> list[tuple[str, chess.Board, dict]]:
+    """Parse an EPD suite into (id, board, operations), keeping only bm/am positions."""
+    positions = []
+    with open(path) as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            board, operations = chess.Board.from_epd(line)
+            if "bm" in operations or "am" in operations:
+                positions.append(
+                    (str(operations.get("id", line_number)), board, operations)
+                )
+    return positions
+
+
+def is_solution(move: chess.Move, operations: dict) -> bool:
+    """A move solves a position if it is a best move and not an avoid move."""
+    if move is None:
+        return False
+    if "bm" in operations and move not in operations["bm"]:
+        return False
+    return move not in operations.get("am", [])
+
+
+def run_iterative(engine, board: chess.Board, operations: dict, time_limit: float):
+    """Deepen until the time limit and time when the final answer first appeared."""
+    engine.start_search(SearchLimits(movetime=time_limit))
+    started = time.perf_counter()
+    iterations = []  # (elapsed, best move) after each completed depth
+
+    def should_stop() -> bool:
+        pv = engine.principal_variation
+        iterations.append((time.perf_counter() - started, pv[0] if pv else None))
+        return time.perf_counter() - started >= time_limit
+
+    pv, _ = engine.iterative_deepening(board, board.turn, 64, should_stop)
+    elapsed = time.perf_counter() - started
+    best_move = pv[0] if pv else None
+    if not is_solution(best_move, operations):
+        return best_move, False, None, elapsed
+
+    # Solved from the first iteration after which every answer was a solution
+    iterations.append((elapsed, best_move))
+    solve_time = elapsed
+    for iteration_time, move in reversed(iterations):
+        if not is_solution(move, operations):
+            break
+        solve_time = iteration_time
+    return best_move, True, solve_time, elapsed
+
+
+async def run_fixed(engine, board: chess.Board, operations: dict, time_limit: float):
+    """Ask a fixed-depth engine for a move, counting it unsolved if it overruns."""
+    started = time.perf_counter()
+    task = asyncio.ensure_future(request_engine_move(engine, board, board.turn))
+    try:
+        best_move = await asyncio.wait_for(asyncio.shield(task), time_limit)
+    except asyncio.TimeoutError:
+        engine.stop()
+        await task  # The engine shares state between moves; let it finish first
+        return None, False, None, time.perf_counter() - started
+    elapsed = time.perf_counter() - started
+    solved = is_solution(best_move, operations)
+    return best_move, solved, elapsed if solved else None, elapsed
+
+
+def run_suite(
+    engine, positions: list, time_limit: float, verbose: bool = True
+) -> list[dict]:
+    """Run engine over every position and return one result row per position."""
+    results = []
+    for position_id, board, operations in positions:
+        engine.nodes = 0
+        if hasattr(engine, "transposition_table"):
+            engine.transposition_table.clear()
+
+        if hasattr(engine, "iterative_deepening"):
+            best_move, solved, solve_time, elapsed = run_iterative(
+                engine, board, operations, time_limit
+            )
+        else:
+            best_move, solved, solve_time, elapsed = asyncio.run(
+                run_fixed(engine, board, operations, time_limit)
+            )
+
+        result = {
+            "id": position_id,
+            "solved": solved,
+            "move": board.san(best_move) if best_move else None,
+            "expected": " ".join(board.san(move) for move in operations.get("bm", [])),
+            "avoid": " ".join(board.san(move) for move in operations.get("am", [])),
+            "solve_time": round(solve_time, 4) if solve_time is not None else None,
+            "time": round(elapsed, 4),
+            "nodes": engine.nodes,
+        }
+        results.append(result)
+        if verbose:
+            status = "solved" if solved else "failed"
+            print(
+                f"{position_id}: {status} ({result['move']}) "
+                f"in {elapsed:.2f}s, {engine.nodes} nodes"
+            )
+    return results
+
+
+def summarize(results: list[dict]) -> str:
+    """Solved count, time-to-solve distribution and overall nodes per second."""
+    solved = [result for result in results if result["solved"]]
+    total_time = sum(result["time"] for result in results)
+    total_nodes = sum(result["nodes"] for result in results)
+    lines = [f"Solved {len(solved)}/{len(results)}"]
+
+    if solved:
+        solve_times = sorted(result["solve_time"] for result in solved)
+        lines.append(
+            f"Solve time: mean {statistics.mean(solve_times):.3f}s, "
+            f"median {statistics.median(solve_times):.3f}s, max {solve_times[-1]:.3f}s"
+        )
+        for bucket in SOLVE_TIME_BUCKETS:
+            count = sum(1 for solve_time in solve_times if solve_time <= bucket)
+            lines.append(f"  solved within {bucket:>5}s: {count}")
+
+    nps = total_nodes / total_time if total_time else 0
+    lines.append(f"Nodes: {total_nodes} in {total_time:.2f}s ({nps:.0f} NPS)")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run an EPD test suite.")
+    parser.add_argument("suite", help="EPD file with bm and/or am operations")
+    parser.add_argument(
+        "--engine", default="aqua5", help="Engine name with options, e.g. aqua4:depth=3"
+    )
+    parser.add_argument("--time", type=float, default=5.0, help="Seconds per position")
+    parser.add_argument("--output", default=None, help="Per-position CSV results")
+    options = parser.parse_args()
+
+    name, engine_options = parse_engine_spec(options.engine)
+    engine = create_engine(name, **engine_options)
+    results = run_suite(engine, read_suite(options.suite), options.time)
+
+    if options.output and results:
+        with open(options.output, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+    print(summarize(results))
+
+
+if __name__ == "__main__":
+    main()
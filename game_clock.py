@@ -0,0 +1,79 @@
+import chess
+import time
+
+NS_PER_SECOND = 1_000_000_000
+
+
+class GameClock:
+    """A two-sided chess clock measured with time.monotonic_ns.
+
+    Only the side to move's clock runs. press() charges that side exactly once
+    for the time since its turn started, adds the increment if it has not
+    flagged, and starts the opponent's clock.
+    """
+
+    def __init__(self, initial_seconds: float, increment_seconds: float) -> None:
+        self.remaining_ns = {
+            chess.WHITE: int(initial_seconds * NS_PER_SECOND),
+            chess.BLACK: int(initial_seconds * NS_PER_SECOND),
+        }
+        self.increment_ns = int(increment_seconds * NS_PER_SECOND)
+        self.turn = chess.WHITE
+        self.turn_started_ns = None  # None while the clock is stopped
+
+    def now_ns(self) -> int:
+        return time.monotonic_ns()
+
+    def start(self, color: chess.Color) -> None:
+        """Start color's clock."""
+        self.turn = color
+        self.turn_started_ns = self.now_ns()
+
+    def stop(self) -> None:
+        """Charge the running side for its time so far and stop the clock."""
+        if self.turn_started_ns is not None:
+            self.remaining_ns[self.turn] -= self.elapsed_ns()
+            self.turn_started_ns = None
+
+    def elapsed_ns(self) -> int:
+        """Time spent on the current turn."""
+        if self.turn_started_ns is None:
+            return 0
+        return self.now_ns() - self.turn_started_ns
+
+    def remaining(self, color: chess.Color) -> float:
+        """Seconds left on color's clock, including the turn in progress."""
+        remaining_ns = self.remaining_ns[color]
+        if color == self.turn:
+            remaining_ns -= self.elapsed_ns()
+        return remaining_ns / NS_PER_SECOND
+
+    def is_flagged(self, color: chess.Color) -> bool:
+        return self.remaining(color) <= 0
+
+    def press(self) -> None:
+        """End the mover's turn: charge it once, add the increment and start the opponent."""
+        mover = self.turn
+        self.stop()
+        if self.remaining_ns[mover] > 0:
+            self.remaining_ns[mover] += self.increment_ns
+        self.start(not mover)
+
+
+class VirtualClock(GameClock):
+    """A GameClock on simulated time, which only moves when advance() is called.
+
+    Headless games charge each move the time its engine spent thinking, so
+    time controls, increments and losses on time play out without waiting.
+    """
+
+    def __init__(self, initial_seconds: float, increment_seconds: float) -> None:
+        super().__init__(initial_seconds, increment_seconds)
+        self.virtual_ns = 0
+
+    def now_ns(self) -> int:
+        return self.virtual_ns
+
+    def advance(self, seconds: float) -> None:
+        """Let seconds pass on the running side's clock."""
+        self.virtual_ns += int(seconds * NS_PER_SECOND)
@@ -0,0 +1,189 @@
+import chess
+import chess.engine
+import chess.pgn
+import datetime
+import mmap
+import struct
+import sys
+from array import array
+from typing import Iterator, NamedTuple
+
+from engine_utils import mate_in
+
+# Binary game record format (all integers little-endian):
+#   file header:  b"CHGR", u16 version
+#   per game:     u16 ply count, u8 result code, u8 FEN length (0 = standard start),
+#                 FEN bytes, then one u16 per ply
+# Each move packs into 16 bits: to square in bits 0-5, from square in bits 6-11
+# and the promotion piece type (0 for none) in bits 12-14.
+FILE_MAGIC = b"CHGR"
+FILE_VERSION = 1
+FILE_HEADER = struct.Struct("<4sH")
+GAME_HEADER = struct.Struct("<HBB")
+
+RESULT_CODES = {"1-0": 0, "0-1": 1, "1/2-1/2": 2, "*": 3}
+RESULTS = {code: result for result, code in RESULT_CODES.items()}
+
+
+def encode_move(move: chess.Move) -> int:
+    """Pack a move into 16 bits."""
+    return move.to_square | (move.from_square << 6) | ((move.promotion or 0) << 12)
+
+
+def decode_move(code: int) -> chess.Move:
+    """Unpack a move packed by encode_move."""
+    return chess.Move((code >> 6) & 0x3F, code & 0x3F, ((code >> 12) & 0x7) or None)
+
+
+def build_pgn(game) -> chess.pgn.Game:
+    """Build a PGN game from a finished ChessGame, with clock and eval comments per move."""
+    pgn = chess.pgn.Game()
+    pgn.headers["Event"] = "Chessaholic Game"
+    pgn.headers["Date"] = datetime.date.today().strftime("%Y.%m.%d")
+    pgn.headers["White"] = game.white.name if game.white else "Human"
+    pgn.headers["Black"] = game.black.name if game.black else "Human"
+    pgn.headers["Result"] = game.result()
+    pgn.headers["TimeControl"] = game.time_control
+    if game.game_over:
+        pgn.headers["Termination"] = game.game_over
+
+    board = chess.Board(game.starting_fen)
+    if game.starting_fen != chess.STARTING_FEN:
+        pgn.setup(board)
+
+    node = pgn
+    for move, clock, evaluation in zip(
+        game.board.move_stack, game.move_clocks, game.move_evals
+    ):
+        mover = board.turn
+        board.push(move)
+        node = node.add_variation(move)
+        node.set_clock(clock)
+        if evaluation is not None:
+            # Engines report scores for the mover; PGN evals are from white's side
+            node.set_eval(chess.engine.PovScore(pgn_score(evaluation), mover))
+    return pgn
+
+
+def pgn_score(evaluation: float) -> chess.engine.Score:
+    """The mover's search score in pawns as a score for the position after its move."""
+    moves = mate_in(evaluation)
+    if moves is None:
+        return chess.engine.Cp(round(evaluation * 100))
+    if moves > 0:
+        # The move just played is the first of the mover's mating moves
+        return chess.engine.Mate(moves - 1) if moves > 1 else chess.engine.MateGiven
+    return chess.engine.Mate(moves)
+
+
+class PgnWriter:
+    """Appends each finished game to a PGN file as soon as it ends."""
+
+    def __init__(self, path: str) -> None:
+        self.file = open(path, "a", encoding="utf-8")
+
+    def write_game(self, game) -> None:
+        print(build_pgn(game), file=self.file, end="\n\n")
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class BinaryGameWriter:
+    """Appends each finished game to a compact binary record file."""
+
+    def __init__(self, path: str) -> None:
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION))
+
+    def write_game(self, game) -> None:
+        self.write_moves(game.board.move_stack, game.result(), game.starting_fen)
+
+    def write_moves(
+        self, moves: list[chess.Move], result: str, fen: str = chess.STARTING_FEN
+    ) -> None:
+        """Write one game given its moves, PGN result string and starting FEN."""
+        fen_bytes = b"" if fen == chess.STARTING_FEN else fen.encode("ascii")
+        codes = array("H", (encode_move(move) for move in moves))
+        if sys.byteorder != "little":
+            codes.byteswap()
+        self.file.write(
+            GAME_HEADER.pack(len(codes), RESULT_CODES[result], len(fen_bytes))
+        )
+        self.file.write(fen_bytes)
+        self.file.write(codes.tobytes())
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class GameRecord(NamedTuple):
+    result: str
+    fen: str
+    moves: array  # Packed u16 move codes, copied out of the mapped file
+
+    def board(self) -> chess.Board:
+        """Replay the game and return the final position."""
+        board = chess.Board(self.fen)
+        for code in self.moves:
+            board.push(decode_move(code))
+        return board
+
+
+class BinaryGameReader:
+    """Memory-maps a binary record file and iterates its games.
+
+    Each record owns a copy of its moves rather than a view into the map, so
+    records stay usable, and the reader can be closed, however far iteration got.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = FILE_HEADER.unpack_from(self.map, 0)
+        if magic != FILE_MAGIC or version != FILE_VERSION:
+            raise ValueError(f"{path} is not a version {FILE_VERSION} game record file")
+
+    def __iter__(self) -> Iterator[GameRecord]:
+        offset = FILE_HEADER.size
+        size = len(self.map)
+        while offset < size:
+            ply_count, result_code, fen_length = GAME_HEADER.unpack_from(
+                self.map, offset
+            )
+            offset += GAME_HEADER.size
+            if fen_length:
+                fen = self.map[offset : offset + fen_length].decode("ascii")
+            else:
+                fen = chess.STARTING_FEN
+            offset += fen_length
+            moves = array("H", self.map[offset : offset + 2 * ply_count])
+            if sys.byteorder != "little":
+                moves.byteswap()
+            offset += 2 * ply_count
+            yield GameRecord(RESULTS[result_code], fen, moves)
+
+    def close(self) -> None:
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
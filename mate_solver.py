@@ -0,0 +1,220 @@
+"""Proof-number search for forced mates.
+
+The solver grows a best-first AND/OR tree: the attacker (the side to move at
+the root) needs one move that mates, the defender must be mated after every
+reply. Each node carries a proof number and a disproof number, the fewest
+leaves that would still have to be solved to prove or to refute a forced
+mate below it, and every iteration expands the most-proving leaf. The tree
+is capped at max_nodes, so memory stays bounded and an unsolved search ends
+with an "unknown" result. A node limit, a deadline or a stop callback end it
+the same way.
+
+Usage: python mate_solver.py "6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1" --moves 3
+"""
+
+import argparse
+import time
+from typing import Callable, NamedTuple
+
+import chess
+
+from engine_utils import position_status
+
+INFINITY = 10**9
+
+MATE, NO_MATE, UNKNOWN = "mate", "no mate", "unknown"
+
+
+class MateResult(NamedTuple):
+    status: str  # MATE, NO_MATE within the move limit, or UNKNOWN if the budget ran out
+    moves: list[chess.Move]  # Main line of the mate, ending in checkmate
+    nodes: int
+
+
+class Node:
+    __slots__ = ("move", "parent", "children", "proof", "disproof", "attacker", "ply")
+
+    def __init__(self, move: chess.Move, parent, attacker: bool, ply: int) -> None:
+        self.move = move
+        self.parent = parent
+        self.children = None  # None until expanded
+        self.proof = 1
+        self.disproof = 1
+        self.attacker = attacker  # OR node: the mating side is to move
+        self.ply = ply
+
+
+class MateSolver:
+    def __init__(
+        self,
+        max_nodes: int = 200_000,
+        node_limit: int = None,
+        deadline: float = None,
+        should_stop: Callable[[], bool] = None,
+    ) -> None:
+        self.max_nodes = max_nodes  # Node table size
+        self.node_limit = node_limit  # Nodes evaluated over the whole solve
+        self.deadline = deadline  # time.perf_counter() value to give up at
+        self.should_stop = should_stop
+        self.nodes = 0
+
+    def out_of_budget(self) -> bool:
+        """Whether the node limit, the deadline or a stop request ends the solve."""
+        return (
+            (self.node_limit is not None and self.nodes >= self.node_limit)
+            or (self.deadline is not None and time.perf_counter() >= self.deadline)
+            or (self.should_stop is not None and self.should_stop())
+        )
+
+    def solve(self, board: chess.Board, max_moves: int) -> MateResult:
+        """Find the shortest forced mate for the side to move in at most max_moves moves."""
+        self.nodes = 0
+        for moves in range(1, max_moves + 1):
+            status, line = self.prove(board, 2 * moves - 1)
+            if status != NO_MATE:
+                return MateResult(status, line, self.nodes)
+        return MateResult(NO_MATE, [], self.nodes)
+
+    def prove(self, board: chess.Board, max_plies: int) -> tuple[str, list[chess.Move]]:
+        """Proof-number search for a mate within max_plies plies."""
+        board = board.copy()
+        root = Node(None, None, True, 0)
+        self.evaluate(root, board, max_plies)
+        tree_size = 1
+
+        while root.proof and root.disproof:
+            if tree_size >= self.max_nodes or self.out_of_budget():
+                return UNKNOWN, []
+
+            # Descend to the most-proving leaf
+            node = root
+            while node.children is not None:
+                if node.attacker:
+                    node = min(node.children, key=lambda child: child.proof)
+                else:
+                    node = min(node.children, key=lambda child: child.disproof)
+                board.push(node.move)
+
+            tree_size += self.expand(node, board, max_plies)
+
+            # Back the new numbers up to the root
+            while node is not None:
+                self.update(node)
+                if node.move is not None:
+                    board.pop()
+                node = node.parent
+
+        if root.proof:
+            return NO_MATE, []
+        return MATE, self.main_line(root)
+
+    def evaluate(self, node: Node, board: chess.Board, max_plies: int) -> None:
+        """Set a new node's numbers from its position."""
+        self.nodes += 1
+        status = position_status(board)
+        if status.is_checkmate:
+            # Proven if the defender is mated, refuted if the attacker is
+            node.proof, node.disproof = (
+                (INFINITY, 0) if node.attacker else (0, INFINITY)
+            )
+        elif (
+            status.is_stalemate
+            or status.is_insufficient_material
+            or node.ply >= max_plies
+            or board.is_repetition(2)
+        ):
+            node.proof, node.disproof = INFINITY, 0
+        elif node.attacker:
+            # Mobility: a defender with many replies is harder to refute than to prove
+            node.proof, node.disproof = 1, len(status.legal_moves)
+        else:
+            node.proof, node.disproof = len(status.legal_moves), 1
+
+    def expand(self, node: Node, board: chess.Board, max_plies: int) -> int:
+        """Create and evaluate node's children, returning how many were added."""
+        node.children = []
+        for move in board.legal_moves:
+            child = Node(move, node, not node.attacker, node.ply + 1)
+            board.push(move)
+            self.evaluate(child, board, max_plies)
+            board.pop()
+            node.children.append(child)
+            # One proving attacker move is enough; stop generating the rest
+            if node.attacker and child.proof == 0:
+                break
+        return len(node.children)
+
+    def update(self, node: Node) -> None:
+        children = node.children
+        if children is None:
+            return
+        if node.attacker:
+            node.proof = min(child.proof for child in children)
+            node.disproof = min(INFINITY, sum(child.disproof for child in children))
+        else:
+            node.proof = min(INFINITY, sum(child.proof for child in children))
+            node.disproof = min(child.disproof for child in children)
+        if node.attacker and node.proof == 0:
+            # Only the proving moves are needed for the main line
+            node.children = [child for child in children if child.proof == 0]
+
+    def main_line(self, root: Node) -> list[chess.Move]:
+        """Follow proven attacker moves and the defender's longest-lasting replies."""
+        line = []
+        node = root
+        while node.children:
+            if node.attacker:
+                node = next(child for child in node.children if child.proof == 0)
+            else:
+                node = max(node.children, key=self.proven_depth)
+            line.append(node.move)
+        return line
+
+    def proven_depth(self, node: Node) -> int:
+        """Plies left in the proven subtree below node."""
+        if not node.children:
+            return 0
+        if node.attacker:
+            return 1 + min(
+                self.proven_depth(child) for child in node.children if child.proof == 0
+            )
+        return 1 + max(self.proven_depth(child) for child in node.children)
+
+
+def find_mate(
+    board: chess.Board,
+    max_moves: int,
+    max_nodes: int = 200_000,
+    node_limit: int = None,
+    deadline: float = None,
+    should_stop: Callable[[], bool] = None,
+) -> MateResult:
+    """Look for a forced mate in at most max_moves moves for the side to move."""
+    solver = MateSolver(max_nodes, node_limit, deadline, should_stop)
+    return solver.solve(board, max_moves)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Search a position for a forced mate.")
+    parser.add_argument("fen")
+    parser.add_argument("--moves", type=int, default=3, help="Longest mate to look for")
+    parser.add_argument("--nodes", type=int, default=200_000, help="Node table size")
+    options = parser.parse_args()
+
+    board = chess.Board(options.fen)
+    started = time.perf_counter()
+    result = find_mate(board, options.moves, options.nodes)
+    elapsed = time.perf_counter() - started
+    if result.status == MATE:
+        print(
+            f"Mate in {(len(result.moves) + 1) // 2}: {board.variation_san(result.moves)}"
+        )
+    elif result.status == NO_MATE:
+        print(f"No mate in {options.moves}")
+    else:
+        print(f"Unknown: node table full after {options.nodes} nodes")
+    print(f"{result.nodes} nodes in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Client and load generator for move_server.
+
+MoveClient keeps one connection open and matches responses to requests by
+id, so many requests can be in flight at once. Run as a script, it loads
+the server from several connections and reports throughput and latency.
+
+Usage: python move_client.py --socket /tmp/chessaholic.sock --positions positions.epd \
+           --requests 200 --concurrency 16 --depth 3
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import statistics
+import time
+
+import chess
+
+from analysis import read_positions
+
+
+class MoveClient:
+    def __init__(self) -> None:
+        self.reader = None
+        self.writer = None
+        self.ids = itertools.count()
+        self.waiting = {}  # Request id -> future for its response
+        self.read_task = None
+
+    async def connect(
+        self, path: str = None, host: str = "127.0.0.1", port: int = 8765
+    ) -> None:
+        if path is not None:
+            self.reader, self.writer = await asyncio.open_unix_connection(path)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.read_task = asyncio.create_task(self.read_responses())
+
+    async def read_responses(self) -> None:
+        async for line in self.reader:
+            response = json.loads(line)
+            future = self.waiting.pop(response.get("id"), None)
+            if future is not None and not future.done():
+                future.set_result(response)
+        # The server closed the connection
+        for future in self.waiting.values():
+            future.set_exception(ConnectionError("Connection closed by the server"))
+        self.waiting.clear()
+
+    async def request(self, fen: str, **limits) -> dict:
+        """Send one position with limits (depth, nodes, movetime, deadline) and await the answer."""
+        request_id = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[request_id] = future
+        self.writer.write(
+            json.dumps({"id": request_id, "fen": fen, **limits}).encode() + b"\n"
+        )
+        await self.writer.drain()
+        return await future
+
+    async def close(self) -> None:
+        self.writer.close()
+        await self.writer.wait_closed()
+        if self.read_task is not None:
+            self.read_task.cancel()
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+
+async def generate_load(
+    fens: list[str],
+    requests: int,
+    concurrency: int,
+    limits: dict,
+    path: str = None,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+) -> dict:
+    """Send requests positions over concurrency connections, one in flight on each."""
+    clients = [MoveClient() for _ in range(concurrency)]
+    await asyncio.gather(*(client.connect(path, host, port) for client in clients))
+    positions = itertools.cycle(fens)
+    remaining = iter(range(requests))
+    latencies, queue_times, errors = [], [], {}
+
+    async def drive(client: MoveClient) -> None:
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.request(next(positions), **limits)
+            if "error" in response:
+                errors[response["error"]] = errors.get(response["error"], 0) + 1
+            else:
+                latencies.append(time.perf_counter() - started)
+                queue_times.append(response["queue_time"])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(drive(client) for client in clients))
+    elapsed = time.perf_counter() - started
+    await asyncio.gather(*(client.close() for client in clients))
+
+    stats = {
+        "requests": requests,
+        "completed": len(latencies),
+        "errors": errors,
+        "elapsed": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+    }
+    if latencies:
+        stats.update(
+            {
+                "latency_mean": statistics.mean(latencies),
+                "latency_p50": percentile(latencies, 0.5),
+                "latency_p90": percentile(latencies, 0.9),
+                "latency_p99": percentile(latencies, 0.99),
+                "latency_max": max(latencies),
+                "queue_time_mean": statistics.mean(queue_times),
+            }
+        )
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test a move server.")
+    parser.add_argument("--socket", default=None, help="Unix socket path")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--positions", default=None, help="EPD or FEN file (default: start position)"
+    )
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Connections, one request in flight each",
+    )
+    parser.add_argument("--depth", type=int, default=None)
+    parser.add_argument("--nodes", type=int, default=None)
+    parser.add_argument("--movetime", type=float, default=None)
+    parser.add_argument("--deadline", type=float, default=None)
+    options = parser.parse_args()
+
+    fens = (
+        [fen for _, fen in read_positions(options.positions)]
+        if options.positions
+        else [chess.STARTING_FEN]
+    )
+    limits = {
+        name: getattr(options, name)
+        for name in ("depth", "nodes", "movetime", "deadline")
+        if getattr(options, name) is not None
+    }
+    stats = asyncio.run(
+        generate_load(
+            fens,
+            options.requests,
+            options.concurrency,
+            limits,
+            options.socket,
+            options.host,
+            options.port,
+        )
+    )
+
+    print(
+        f"{stats['completed']}/{stats['requests']} completed in {stats['elapsed']:.2f}s "
+        f"({stats['throughput']:.1f} requests/s)"
+    )
+    if stats["completed"]:
+        print(
+            f"Latency: mean {stats['latency_mean'] * 1000:.1f}ms, "
+            f"p50 {stats['latency_p50'] * 1000:.1f}ms, "
+            f"p90 {stats['latency_p90'] * 1000:.1f}ms, "
+            f"p99 {stats['latency_p99'] * 1000:.1f}ms, "
+            f"max {stats['latency_max'] * 1000:.1f}ms"
+        )
+        print(f"Mean queue time: {stats['queue_time_mean'] * 1000:.1f}ms")
+    for error, count in stats["errors"].items():
+        print(f"{count} x {error}")
+
+
+if __name__ == "__main__":
+    main()
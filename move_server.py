@@ -0,0 +1,232 @@
+"""Local move server speaking JSON lines over a Unix socket or localhost TCP.
+
+Each request line is a JSON object with a FEN and optional limits:
+
+    {"id": 1, "fen": "...", "depth": 4, "nodes": 50000, "movetime": 1.0, "deadline": 2.0}
+
+and gets one response line with the same id, in completion order:
+
+    {"id": 1, "best_move": "e2e4", "score": 0.35, "mate": null, "pv": "e2e4 e7e5",
+     "depth": 4, "nodes": 51234, "time": 0.84, "queue_time": 0.01}
+
+with "mate" the moves to a forced mate (negative if being mated) in place of a
+score, or {"id": 1, "error": "..."}. Searches run on a pool of worker processes,
+each holding an engine created when the server starts. Requests wait in a
+bounded queue for a free worker. Once the queue is full, new requests are
+answered with an "overloaded" error at once, so clients can back off. A
+deadline, in seconds from arrival, caps the movetime and fails the request
+if it is still queued when the deadline passes.
+
+Usage: python move_server.py --socket /tmp/chessaholic.sock --engine aqua5 --workers 4
+       python move_server.py --port 8765
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import os
+import time
+
+import chess
+
+from analysis import analyse_position, init_worker
+from engines import parse_engine_spec
+
+DEADLINE_GRACE = 0.5  # Seconds a search may overrun its deadline before it is abandoned
+
+
+def worker_pid() -> int:
+    return os.getpid()
+
+
+class MoveServer:
+    def __init__(
+        self,
+        engine: str = "aqua5",
+        engine_options: dict = None,
+        workers: int = None,
+        depth: int = 4,
+        max_queue: int = 64,
+    ) -> None:
+        self.engine = engine
+        self.engine_options = engine_options or {}
+        self.workers = workers or os.cpu_count()
+        self.depth = depth  # Used when a request gives no depth
+        self.max_queue = max_queue  # Requests allowed to wait for a worker
+        self.executor = None
+        self.server = None
+        self.free_workers = None
+        self.pending = 0  # Requests queued or running
+        self.served = 0
+        self.rejected = 0
+
+    async def start(
+        self, path: str = None, host: str = "127.0.0.1", port: int = 8765
+    ) -> None:
+        """Start the worker pool, wait until every worker is up and begin listening."""
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            self.workers,
+            initializer=init_worker,
+            initargs=(self.engine, self.engine_options),
+        )
+        self.free_workers = asyncio.Semaphore(self.workers)
+        await self.warm_up()
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.handle_connection, path)
+        else:
+            self.server = await asyncio.start_server(self.handle_connection, host, port)
+
+    async def warm_up(self) -> None:
+        """Spawn every worker, and so build every engine, before the first request."""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(self.executor, worker_pid)
+                for _ in range(self.workers)
+            )
+        )
+
+    async def serve_forever(self) -> None:
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Answer every request line on a connection, several at a time."""
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(line: bytes) -> None:
+            response = await self.handle_request(line)
+            async with write_lock:
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+
+        try:
+            async for line in reader:
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(respond(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def handle_request(self, line: bytes) -> dict:
+        arrived = time.perf_counter()
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            fen = request["fen"]
+            chess.Board(fen)  # Reject bad positions before they reach a worker
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            self.rejected += 1
+            return {"id": request_id, "error": f"bad request: {error}"}
+
+        if self.pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            return {"id": request_id, "error": "overloaded"}
+
+        self.pending += 1
+        try:
+            return await self.search(request_id, fen, request, arrived)
+        finally:
+            self.pending -= 1
+
+    async def search(self, request_id, fen: str, request: dict, arrived: float) -> dict:
+        """Wait for a free worker, then search within the request's limits."""
+        deadline = request.get("deadline")
+        movetime = request.get("movetime")
+        await self.free_workers.acquire()
+        queue_time = time.perf_counter() - arrived
+        timeout = None
+        if deadline is not None:
+            remaining = deadline - queue_time
+            if remaining <= 0:
+                self.free_workers.release()
+                return {"id": request_id, "error": "deadline exceeded"}
+            movetime = remaining if movetime is None else min(movetime, remaining)
+            timeout = remaining + DEADLINE_GRACE
+
+        future = asyncio.wrap_future(
+            self.executor.submit(
+                analyse_position,
+                str(request_id),
+                fen,
+                request.get("depth", self.depth),
+                request.get("nodes"),
+                movetime,
+            )
+        )
+        # The worker stays busy until the search really ends, even if it is abandoned
+        future.add_done_callback(lambda _: self.free_workers.release())
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            return {"id": request_id, "error": "deadline exceeded"}
+        except Exception as error:
+            return {"id": request_id, "error": f"search failed: {error}"}
+
+        self.served += 1
+        result["id"] = request_id
+        result["queue_time"] = round(queue_time, 4)
+        return result
+
+
+async def run_server(options: argparse.Namespace) -> None:
+    engine, engine_options = parse_engine_spec(options.engine)
+    server = MoveServer(
+        engine, engine_options, options.workers, options.depth, options.max_queue
+    )
+    await server.start(options.socket, options.host, options.port)
+    where = options.socket or f"{options.host}:{options.port}"
+    print(f"Serving {engine} on {where} with {server.workers} workers")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve engine moves over JSON lines.")
+    parser.add_argument("--socket", default=None, help="Unix socket path")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--engine", default="aqua5", help="Engine name with options, e.g. aqua5:depth=6"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--depth", type=int, default=4, help="Depth for requests that give none"
+    )
+    parser.add_argument(
+        "--max-queue",
+        type=int,
+        default=64,
+        help="Requests allowed to wait for a worker",
+    )
+    options = parser.parse_args()
+    try:
+        asyncio.run(run_server(options))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Play many headless games concurrently in one process.
+
+Every game is a ChessGame without the GUI, driven on one asyncio event loop.
+Their engines are PooledEngine proxies that send each search to a shared
+process pool, so all cores stay busy however many games are in progress.
+Each worker process keeps one engine per engine spec and color, reused by
+every game it serves.
+
+Clocks are virtual by default: each move is charged the time its search
+took in the worker, not the time it waited for a free worker, so however
+many games share the pool their clocks stay fair. With --wall-clock they run
+on wall time instead, queueing included.
+
+Usage: python multigame.py --white aqua4 --black aqua3:depth=1 --games 200 \
+           --workers 8 --time-control 60+0 --pgn games.pgn
+"""
+
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
+import os
+import time
+
+import chess
+
+from chessaholic import ChessEngine, ChessGame, SearchLimits
+from engines import create_engine, parse_engine_spec
+from game_records import BinaryGameWriter, PgnWriter
+
+# Engines owned by each worker process, keyed by (name, options, color)
+worker_engines = {}
+
+
+def pooled_move(
+    engine_name: str,
+    engine_options: dict,
+    color: chess.Color,
+    board: chess.Board,
+    limits: SearchLimits = None,
+) -> tuple[chess.Move, float, int, float]:
+    """Search board in this worker with its engine for the spec and color.
+
+    Returns the move, its evaluation, the nodes searched and the seconds taken.
+    """
+    key = (engine_name, tuple(sorted(engine_options.items())), color)
+    engine = worker_engines.get(key)
+    if engine is None:
+        engine = worker_engines[key] = create_engine(engine_name, **engine_options)
+    engine.stop_requested = False
+    engine.last_evaluation = None
+    engine.nodes = 0
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(None):
+        move = asyncio.run(engine.move(board, color, limits))
+    return move, engine.last_evaluation, engine.nodes, time.perf_counter() - started
+
+
+class PooledEngine(ChessEngine):
+    """Stand-in for a registry engine that searches on a shared process pool."""
+
+    blocking = False
+
+    def __init__(
+        self,
+        executor: concurrent.futures.Executor,
+        engine_name: str,
+        engine_options: dict = None,
+        name: str = None,
+        author: str = "Anonymous",
+    ) -> None:
+        engine_options = engine_options or {}
+        super().__init__(name or engine_name, author, engine_options.get("book"))
+        self.executor = executor
+        self.engine_name = engine_name
+        self.engine_options = engine_options
+
+    async def move(
+        self, board: chess.Board, color: chess.Color, limits: SearchLimits = None
+    ) -> chess.Move:
+        loop = asyncio.get_running_loop()
+        (
+            move,
+            self.last_evaluation,
+            self.nodes,
+            self.last_think_time,
+        ) = await loop.run_in_executor(
+            self.executor,
+            pooled_move,
+            self.engine_name,
+            self.engine_options,
+            color,
+            board,
+            limits,
+        )
+        return move
+
+
+async def play_games(
+    white: str,
+    black: str,
+    games: int,
+    workers: int = None,
+    time_control: str = "60+0",
+    alternate: bool = True,
+    recorders: list = None,
+    virtual_clock: bool = True,
+) -> list[ChessGame]:
+    """Play games between two engine specs at once, swapping colors every game if alternate.
+
+    With virtual_clock, moves are charged their search time in the worker
+    (see pooled_move); otherwise the clocks run on wall time.
+    """
+    specs = [parse_engine_spec(white), parse_engine_spec(black)]
+    # One local instance per spec, only for the display name and author
+    labels = [create_engine(name, **options) for name, options in specs]
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        matches = []
+        for index in range(games):
+            order = [1, 0] if alternate and index % 2 else [0, 1]
+            players = [
+                PooledEngine(
+                    executor,
+                    *specs[side],
+                    labels[side].name,
+                    labels[side].author,
+                )
+                for side in order
+            ]
+            matches.append(
+                ChessGame(
+                    use_gui=False,
+                    white=players[0],
+                    black=players[1],
+                    recorders=recorders,
+                    time_control=time_control,
+                    virtual_clock=virtual_clock,
+                )
+            )
+        await asyncio.gather(*(game.play_game() for game in matches))
+    return matches
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Play many headless games at once.")
+    parser.add_argument(
+        "--white", default="aqua4", help="Engine spec, e.g. aqua5:depth=3"
+    )
+    parser.add_argument("--black", default="aqua3")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--time-control", default="60+0", help="Minutes+increment seconds per game"
+    )
+    parser.add_argument(
+        "--no-alternate", action="store_true", help="Keep --white on white every game"
+    )
+    parser.add_argument(
+        "--wall-clock",
+        action="store_true",
+        help="Run clocks on wall time, including time spent waiting for a worker",
+    )
+    parser.add_argument(
+        "--pgn", default=None, help="Append finished games to a PGN file"
+    )
+    parser.add_argument(
+        "--records", default=None, help="Append finished games to a binary record file"
+    )
+    options = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        recorders = []
+        if options.pgn:
+            recorders.append(stack.enter_context(PgnWriter(options.pgn)))
+        if options.records:
+            recorders.append(stack.enter_context(BinaryGameWriter(options.records)))
+
+        started = time.perf_counter()
+        games = asyncio.run(
+            play_games(
+                options.white,
+                options.black,
+                options.games,
+                options.workers,
+                options.time_control,
+                not options.no_alternate,
+                recorders,
+                not options.wall_clock,
+            )
+        )
+        elapsed = time.perf_counter() - started
+
+    # Score from the point of view of the --white spec
+    score = collections.Counter()
+    for index, game in enumerate(games):
+        result = game.result()
+        if not options.no_alternate and index % 2:
+            result = {"1-0": "0-1", "0-1": "1-0"}.get(result, result)
+        score[result] += 1
+    plies = sum(len(game.board.move_stack) for game in games)
+    print(
+        f"{options.white} vs {options.black}: +{score['1-0']} -{score['0-1']} "
+        f"={score['1/2-1/2']} ({score['*']} unfinished)"
+    )
+    print(f"{len(games)} games, {plies} plies in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Sampling profiler for engine moves.
+
+While an engine thinks, a background thread samples the stack of the thread
+running its move at a fixed interval, so only the search is profiled and
+never the GUI or the event loop. Samples are aggregated per engine across
+every move they are given, and can be written as collapsed stacks for
+flamegraph.pl or speedscope, or summarized as a table of the hottest
+functions.
+
+Usage:
+    profiler = MoveProfiler()
+    game = ChessGame(use_gui=False, white=white, black=black, profiler=profiler)
+    await game.play_game()
+    profiler.write_collapsed("moves.folded")
+    print(profiler.report(top=20))
+"""
+
+import collections
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+def frame_label(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_qualname}"
+
+
+class MoveProfiler:
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval  # Seconds between samples
+        self.samples = collections.defaultdict(collections.Counter)  # Per engine
+        self.move_counts = collections.Counter()
+        self.move_times = collections.Counter()
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def profile(self, engine_name: str):
+        """Sample the calling thread's stack until the block exits."""
+        thread_id = threading.get_ident()
+        done = threading.Event()
+        stacks = collections.Counter()
+
+        def sampler() -> None:
+            # Wait first, so a move that returns at once costs nothing
+            while not done.wait(self.interval):
+                frame = sys._current_frames().get(thread_id)
+                labels = []
+                while frame is not None:
+                    labels.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                stacks[tuple(reversed(labels))] += 1
+
+        thread = threading.Thread(target=sampler, daemon=True)
+        started = time.perf_counter()
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+            with self.lock:
+                self.samples[engine_name].update(stacks)
+                self.move_counts[engine_name] += 1
+                self.move_times[engine_name] += time.perf_counter() - started
+
+    def collapsed(self, engine_name: str = None) -> list[str]:
+        """Collapsed stack lines, "frame;frame;frame count", rooted at the engine name."""
+        lines = []
+        names = [engine_name] if engine_name is not None else sorted(self.samples)
+        for name in names:
+            for stack, count in self.samples[name].items():
+                lines.append(f"{';'.join((name,) + stack)} {count}")
+        return lines
+
+    def write_collapsed(self, path: str, engine_name: str = None) -> None:
+        with open(path, "w") as file:
+            for line in self.collapsed(engine_name):
+                file.write(line + "\n")
+
+    def top_functions(self, engine_name: str, top: int = 20) -> list[tuple]:
+        """The hottest functions as (function, self samples, total samples), by self time."""
+        own = collections.Counter()
+        total = collections.Counter()
+        for stack, count in self.samples[engine_name].items():
+            if stack:
+                own[stack[-1]] += count
+            for label in set(stack):  # Recursive functions count once per sample
+                total[label] += count
+        return [(label, count, total[label]) for label, count in own.most_common(top)]
+
+    def report(self, top: int = 20) -> str:
+        """A per-engine table of the hottest functions."""
+        lines = []
+        for name in sorted(self.samples):
+            sample_count = sum(self.samples[name].values())
+            lines.append(
+                f"{name}: {self.move_counts[name]} moves, "
+                f"{self.move_times[name]:.2f}s, {sample_count} samples"
+            )
+            lines.append(f"  {'self %':>7} {'total %':>7}  function")
+            for label, own, total in self.top_functions(name, top):
+                lines.append(
+                    f"  {100 * own / sample_count:7.1f} "
+                    f"{100 * total / sample_count:7.1f}  {label}"
+                )
+        return "\n".join(lines)
@@ -1,5 +1,5 @@
 import chess
-from chessaholic import ChessEngine
+from chessaholic import ChessEngine, SearchLimits
 import random
 
 
@@ -7,7 +7,7 @@ class RandomBot(ChessEngine):
     def __init__(self) -> None:
         super().__init__("Random Bot", "proplayer919")
     
-    async def move(self, board: chess.Board, color: chess.Color) -> chess.Move:
+    async def move(self, board: chess.Board, color: chess.Color, limits: SearchLimits = None) -> chess.Move:
         print(f"{"White" if color == chess.WHITE else "Black"} is selecting a move...")
         moves = list(board.legal_moves)
         print(f"Picking a random move for {"white" if color == chess.WHITE else "black"}...")
@@ -0,0 +1,191 @@
+"""Headless self-play generator for evaluation-tuning data.
+
+Worker processes play engines against each other and sample positions into
+preallocated NumPy buffers, which are written out as sharded .npz files:
+
+    boards    uint64 (N, 12)  piece bitboards, white P N B R Q K then black
+    turn      int8   (N,)     1 if white is to move, 0 otherwise
+    castling  uint64 (N,)     castling rights mask
+    ep_square int8   (N,)     en passant square or -1
+    score     float32 (N,)    search score from white's side
+    result    int8   (N,)     final game result from white's side (1, 0, -1)
+
+Usage: python selfplay.py --games 1000 --workers 8 --output data
+"""
+
+import argparse
+import asyncio
+import contextlib
+import multiprocessing
+import os
+import random
+
+import chess
+import numpy as np
+
+from engines import create_engine, parse_engine_spec
+
+PIECE_PLANES = [
+    (color, piece_type)
+    for color in (chess.WHITE, chess.BLACK)
+    for piece_type in chess.PIECE_TYPES
+]
+RESULT_VALUES = {"1-0": 1, "0-1": -1, "1/2-1/2": 0}
+
+
+class PositionBuffer:
+    """Fixed-size NumPy arrays that sampled positions are written into in place."""
+
+    def __init__(self, capacity: int) -> None:
+        self.boards = np.zeros((capacity, len(PIECE_PLANES)), dtype=np.uint64)
+        self.turn = np.zeros(capacity, dtype=np.int8)
+        self.castling = np.zeros(capacity, dtype=np.uint64)
+        self.ep_square = np.zeros(capacity, dtype=np.int8)
+        self.score = np.zeros(capacity, dtype=np.float32)
+        self.result = np.zeros(capacity, dtype=np.int8)
+        self.count = 0
+
+    def add(self, board: chess.Board, white_score: float) -> None:
+        row = self.count
+        for plane, (color, piece_type) in enumerate(PIECE_PLANES):
+            self.boards[row, plane] = board.pieces_mask(piece_type, color)
+        self.turn[row] = board.turn == chess.WHITE
+        self.castling[row] = board.castling_rights
+        self.ep_square[row] = -1 if board.ep_square is None else board.ep_square
+        self.score[row] = white_score
+        self.count += 1
+
+    def set_result(self, start: int, result: int) -> None:
+        """Fill in the game result for every row sampled since start."""
+        self.result[start : self.count] = result
+
+    def save(self, path: str) -> None:
+        count = self.count
+        np.savez(
+            path,
+            boards=self.boards[:count],
+            turn=self.turn[:count],
+            castling=self.castling[:count],
+            ep_square=self.ep_square[:count],
+            score=self.score[:count],
+            result=self.result[:count],
+        )
+        self.count = 0
+
+
+def board_from_row(data, row: int) -> chess.Board:
+    """Rebuild a chess.Board from one row of a loaded shard."""
+    board = chess.Board(None)
+    for plane, (color, piece_type) in enumerate(PIECE_PLANES):
+        for square in chess.scan_forward(int(data["boards"][row, plane])):
+            board.set_piece_at(square, chess.Piece(piece_type, color))
+    board.turn = bool(data["turn"][row])
+    board.castling_rights = int(data["castling"][row])
+    ep_square = int(data["ep_square"][row])
+    board.ep_square = None if ep_square < 0 else ep_square
+    return board
+
+
+def play_game(
+    engines: tuple, buffer: PositionBuffer, rng: random.Random, options
+) -> None:
+    """Play one game and sample its positions into buffer."""
+    board = chess.Board()
+    start = buffer.count
+
+    # Random opening plies so games do not all repeat the same line
+    for _ in range(options.random_plies):
+        moves = list(board.legal_moves)
+        if not moves:
+            break
+        board.push(rng.choice(moves))
+
+    while not board.is_game_over() and board.ply() < options.max_plies:
+        engine = engines[board.turn]
+        with contextlib.redirect_stdout(None):
+            move = asyncio.run(engine.move(board, board.turn))
+        score = engine.last_evaluation
+
+        if (
+            score is not None
+            and board.ply() >= options.skip_plies
+            and not board.is_check()
+            and rng.random() < options.sample_rate
+        ):
+            buffer.add(board, score if board.turn == chess.WHITE else -score)
+
+        board.push(move)
+
+    buffer.set_result(start, RESULT_VALUES.get(board.result(claim_draw=True), 0))
+
+
+def run_worker(worker_id: int, games: int, options) -> int:
+    """Play games in this process, writing a shard every shard_size positions."""
+    rng = random.Random(options.seed * 1000 + worker_id)
+    name, engine_options = parse_engine_spec(options.engine)
+    engines = {
+        chess.WHITE: create_engine(name, **engine_options),
+        chess.BLACK: create_engine(name, **engine_options),
+    }
+    # One game never samples more than max_plies positions, so it always fits
+    buffer = PositionBuffer(options.shard_size + options.max_plies)
+    shard = 0
+    total = 0
+
+    def flush() -> None:
+        nonlocal shard, total
+        if buffer.count:
+            total += buffer.count
+            path = os.path.join(
+                options.output, f"{options.prefix}-{worker_id:03d}-{shard:05d}.npz"
+            )
+            buffer.save(path)
+            shard += 1
+
+    for _ in range(games):
+        for engine in engines.values():
+            engine.transposition_table.clear()
+        play_game(engines, buffer, rng, options)
+        if buffer.count >= options.shard_size:
+            flush()
+    flush()
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate self-play training data.")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", default="selfplay_data")
+    parser.add_argument("--prefix", default="selfplay")
+    parser.add_argument(
+        "--engine",
+        default="aqua5:depth=2",
+        help="Engine name with options; it must report last_evaluation",
+    )
+    parser.add_argument("--shard-size", type=int, default=100_000)
+    parser.add_argument("--sample-rate", type=float, default=0.25)
+    parser.add_argument("--random-plies", type=int, default=8)
+    parser.add_argument("--skip-plies", type=int, default=10)
+    parser.add_argument("--max-plies", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=0)
+    options = parser.parse_args()
+
+    os.makedirs(options.output, exist_ok=True)
+    workers = max(1, min(options.workers, options.games))
+    games_per_worker = [
+        options.games // workers + (1 if i < options.games % workers else 0)
+        for i in range(workers)
+    ]
+    with multiprocessing.Pool(workers) as pool:
+        totals = pool.starmap(
+            run_worker,
+            [(i, games, options) for i, games in enumerate(games_per_worker)],
+        )
+    print(
+        f"Wrote {sum(totals)} positions from {options.games} games to {options.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import chess
+
+from game_records import BinaryGameReader, BinaryGameWriter
+
+MOVES = [chess.Move.from_uci(uci) for uci in ["f2f3", "e7e5", "g2g4", "d8h4"]]
+
+
+def write_games(path, count: int) -> None:
+    with BinaryGameWriter(path) as writer:
+        for _ in range(count):
+            writer.write_moves(MOVES, "0-1")
+
+
+def test_close_after_early_exit(tmp_path):
+    path = tmp_path / "games.bin"
+    write_games(path, 3)
+    with BinaryGameReader(path) as reader:
+        for record in reader:
+            break
+    assert record.board().is_checkmate()
+
+
+def test_records_outlive_the_reader(tmp_path):
+    path = tmp_path / "games.bin"
+    write_games(path, 3)
+    with BinaryGameReader(path) as reader:
+        records = list(reader)
+    assert len(records) == 3
+    assert [record.result for record in records] == ["0-1"] * 3
+    assert list(records[-1].moves) == [
+        move.to_square | move.from_square << 6 for move in MOVES
+    ]
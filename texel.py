@@ -0,0 +1,265 @@
+"""Texel tuner for the piece values and piece-square tables in engine_utils.
+
+Positions are loaded into an int8 feature matrix once, then every parameter
+is fitted together with full-batch gradient descent (Adam) on the mean
+squared error between sigmoid(K * eval) and the game result.
+
+Usage: python texel.py selfplay_data/*.npz --output tuned_engine_utils.py
+"""
+
+import argparse
+import re
+
+import chess
+import numpy as np
+
+import engine_utils
+from selfplay import PIECE_PLANES
+
+TUNED_PIECES = [chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN]
+
+# Parameter vector layout
+MATERIAL = slice(0, 5)
+PST = slice(5, 5 + 5 * 64)  # Pawn to queen tables
+KING_MIDGAME = slice(325, 389)
+KING_ENDGAME = slice(389, 453)
+PARAMETER_COUNT = 453
+
+RESULT_SCORES = {"1-0": 1.0, "0-1": 0.0, "1/2-1/2": 0.5}
+
+
+def initial_parameters() -> np.ndarray:
+    """The current engine_utils values as a parameter vector."""
+    tables = engine_utils.get_position_table(chess.Board())
+    parameters = np.zeros(PARAMETER_COUNT, dtype=np.float64)
+    parameters[MATERIAL] = [engine_utils.piece_values[piece] for piece in TUNED_PIECES]
+    parameters[PST] = np.concatenate([tables[piece] for piece in TUNED_PIECES])
+    parameters[KING_MIDGAME] = engine_utils.king_table_midgame
+    parameters[KING_ENDGAME] = engine_utils.king_table_endgame
+    return parameters
+
+
+def features_from_bitboards(boards: np.ndarray) -> np.ndarray:
+    """Build the (N, PARAMETER_COUNT) int8 feature matrix from (N, 12) piece bitboards.
+
+    Features are white minus black counts, matching a white-POV evaluation that
+    uses the same unmirrored tables for both colors, as the engines do.
+    """
+    count = len(boards)
+    bits = np.unpackbits(
+        boards.astype("<u8").view(np.uint8).reshape(count, 12, 8),
+        axis=-1,
+        bitorder="little",
+    ).reshape(count, 2, 6, 64)
+    planes = bits[:, 0].astype(np.int8) - bits[:, 1].astype(np.int8)
+
+    # Middle game: more than 10 knights, bishops, rooks and queens on the board
+    minor_and_major = bits[:, :, 1:5].sum(axis=(1, 2, 3))
+    middle_game = minor_and_major > 10
+
+    features = np.zeros((count, PARAMETER_COUNT), dtype=np.int8)
+    features[:, MATERIAL] = planes[:, :5].sum(axis=2)
+    features[:, PST] = planes[:, :5].reshape(count, 5 * 64)
+    king = planes[:, 5]
+    features[:, KING_MIDGAME] = np.where(middle_game[:, None], king, 0)
+    features[:, KING_ENDGAME] = np.where(middle_game[:, None], 0, king)
+    return features
+
+
+def load_npz(paths: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Load self-play shards into bitboards and white-POV results in [0, 1]."""
+    boards, results = [], []
+    for path in paths:
+        with np.load(path) as data:
+            boards.append(data["boards"])
+            results.append((data["result"].astype(np.float32) + 1) / 2)
+    return np.concatenate(boards), np.concatenate(results)
+
+
+def load_epd(path: str) -> tuple[np.ndarray, np.ndarray]:
+    """Load an EPD file labelled with c9 "1-0" style results or a trailing [1.0]."""
+    boards, results = [], []
+    with open(path) as file:
+        for line in file:
+            match = re.search(r'c9 "([^"]+)"|\[([01](?:\.\d+)?)\]', line)
+            if match is None:
+                continue
+            if match.group(1) is not None:
+                result = RESULT_SCORES.get(match.group(1))
+                if result is None:
+                    continue
+            else:
+                result = float(match.group(2))
+            board = chess.Board(" ".join(line.split()[:4]) + " 0 1")
+            boards.append(
+                [
+                    board.pieces_mask(piece_type, color)
+                    for color, piece_type in PIECE_PLANES
+                ]
+            )
+            results.append(result)
+    return np.array(boards, dtype=np.uint64), np.array(results, dtype=np.float32)
+
+
+class TexelTuner:
+    def __init__(
+        self, features: np.ndarray, results: np.ndarray, chunk_size: int = 65536
+    ):
+        self.features = features
+        self.results = results.astype(np.float64)
+        self.chunk_size = chunk_size
+
+    def evaluate(self, parameters: np.ndarray) -> np.ndarray:
+        """White-POV evaluation of every position, computed chunk by chunk."""
+        scores = np.empty(len(self.features), dtype=np.float64)
+        weights = parameters.astype(np.float32)
+        for start in range(0, len(self.features), self.chunk_size):
+            chunk = self.features[start : start + self.chunk_size].astype(np.float32)
+            scores[start : start + self.chunk_size] = chunk @ weights
+        return scores
+
+    def error(self, parameters: np.ndarray, k: float) -> float:
+        predicted = 1 / (1 + np.exp(-k * self.evaluate(parameters)))
+        return float(np.mean((predicted - self.results) ** 2))
+
+    def fit_k(self, parameters: np.ndarray) -> float:
+        """Find the sigmoid scale that best maps current evals to results."""
+        scores = self.evaluate(parameters)
+        best_k, best_error = 1.0, float("inf")
+        for k in np.geomspace(1e-3, 10, 200):
+            predicted = 1 / (1 + np.exp(-k * scores))
+            error = float(np.mean((predicted - self.results) ** 2))
+            if error < best_error:
+                best_k, best_error = float(k), error
+        return best_k
+
+    def gradient(self, parameters: np.ndarray, k: float) -> tuple[np.ndarray, float]:
+        """Gradient of the mean squared error with respect to every parameter."""
+        scores = self.evaluate(parameters)
+        predicted = 1 / (1 + np.exp(-k * scores))
+        residual = predicted - self.results
+        # d/ds of (sigmoid(ks) - y)^2, averaged over positions
+        weights = (2 * k / len(scores) * residual * predicted * (1 - predicted)).astype(
+            np.float32
+        )
+        gradient = np.zeros(PARAMETER_COUNT, dtype=np.float64)
+        for start in range(0, len(self.features), self.chunk_size):
+            chunk = self.features[start : start + self.chunk_size].astype(np.float32)
+            gradient += weights[start : start + self.chunk_size] @ chunk
+        return gradient, float(np.mean(residual**2))
+
+    def tune(
+        self,
+        parameters: np.ndarray,
+        epochs: int = 200,
+        learning_rate: float = 0.05,
+        k: float = None,
+        verbose: bool = True,
+    ) -> np.ndarray:
+        """Adam over the full batch."""
+        if k is None:
+            k = self.fit_k(parameters)
+        parameters = parameters.copy()
+        first_moment = np.zeros_like(parameters)
+        second_moment = np.zeros_like(parameters)
+        beta1, beta2, epsilon = 0.9, 0.999, 1e-8
+        for epoch in range(1, epochs + 1):
+            gradient, error = self.gradient(parameters, k)
+            first_moment = beta1 * first_moment + (1 - beta1) * gradient
+            second_moment = beta2 * second_moment + (1 - beta2) * gradient**2
+            step = (first_moment / (1 - beta1**epoch)) / (
+                np.sqrt(second_moment / (1 - beta2**epoch)) + epsilon
+            )
+            parameters -= learning_rate * step
+            if verbose and (epoch % 10 == 0 or epoch == 1):
+                print(f"epoch {epoch}: error {error:.6f}")
+        return parameters
+
+
+def format_table(name: str, values) -> str:
+    rows = [
+        "    "
+        + ", ".join(f"{value:.2f}" for value in values[row * 8 : row * 8 + 8])
+        + ","
+        for row in range(8)
+    ]
+    return f"{name} = [\n" + "\n".join(rows) + "\n]\n"
+
+
+def write_engine_utils(path: str, parameters: np.ndarray) -> None:
+    """Write a drop-in replacement for engine_utils with the tuned values."""
+    material = parameters[MATERIAL]
+    pst = parameters[PST].reshape(5, 64)
+    names = ["PAWN", "KNIGHT", "BISHOP", "ROOK", "QUEEN"]
+    with open(path, "w") as file:
+        file.write(
+            "import chess\n\n"
+            "def is_middle_game(board: chess.Board) -> bool:\n"
+            "    # Count the major and minor pieces remaining\n"
+            "    piece_count = 0\n"
+            "    for piece_type in [chess.ROOK, chess.QUEEN, chess.BISHOP, chess.KNIGHT]:\n"
+            "        piece_count += len(board.pieces(piece_type, chess.WHITE)) + len(\n"
+            "            board.pieces(piece_type, chess.BLACK)\n"
+            "        )\n\n"
+            "    # Middle game is roughly when both sides have 5 or more major and minor pieces\n"
+            "    return piece_count > 10\n\n\n"
+            "piece_values = {\n"
+        )
+        for name, value in zip(names, material):
+            file.write(f"    chess.{name}: {value:.2f},\n")
+        file.write("    chess.KING: 0,\n}\n\n")
+        file.write(format_table("king_table_midgame", parameters[KING_MIDGAME]) + "\n")
+        file.write(format_table("king_table_endgame", parameters[KING_ENDGAME]) + "\n")
+        for name, table in zip(names, pst):
+            file.write(format_table(f"{name.lower()}_table", table) + "\n")
+        file.write(
+            "\ndef get_position_table(board: chess.Board) -> dict[list[float]]:\n"
+            "    position_tables = {\n"
+            + "".join(
+                f"        chess.{name}: {name.lower()}_table,\n" for name in names
+            )
+            + "        chess.KING: king_table_midgame if is_middle_game(board) else king_table_endgame,\n"
+            "    }\n"
+            "    return position_tables\n"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Texel-tune the engine_utils tables.")
+    parser.add_argument(
+        "datasets", nargs="+", help="Self-play .npz shards or labelled .epd files"
+    )
+    parser.add_argument("--output", default="tuned_engine_utils.py")
+    parser.add_argument("--epochs", type=int, default=200)
+    parser.add_argument("--learning-rate", type=float, default=0.05)
+    parser.add_argument(
+        "--k", type=float, default=None, help="Sigmoid scale (fitted if omitted)"
+    )
+    options = parser.parse_args()
+
+    shards = [path for path in options.datasets if path.endswith(".npz")]
+    boards, results = (
+        load_npz(shards)
+        if shards
+        else (np.zeros((0, 12), np.uint64), np.zeros(0, np.float32))
+    )
+    for path in options.datasets:
+        if not path.endswith(".npz"):
+            epd_boards, epd_results = load_epd(path)
+            boards = np.concatenate([boards, epd_boards])
+            results = np.concatenate([results, epd_results])
+
+    tuner = TexelTuner(features_from_bitboards(boards), results)
+    parameters = initial_parameters()
+    k = options.k if options.k is not None else tuner.fit_k(parameters)
+    print(
+        f"{len(results)} positions, K = {k:.4f}, initial error {tuner.error(parameters, k):.6f}"
+    )
+    tuned = tuner.tune(parameters, options.epochs, options.learning_rate, k)
+    print(f"final error {tuner.error(tuned, k):.6f}")
+    write_engine_utils(options.output, tuned)
+    print(f"Wrote tuned tables to {options.output}")
+
+
+if __name__ == "__main__":
+    main()